@@ -0,0 +1,62 @@
+import argparse
+import random
+import time
+
+from back.models.menu import MenuItemOut
+from back.services.menu_search import MenuSearchIndex
+
+_WORDS = ["pepperoni", "margherita", "funghi", "quattro", "formaggi", "diavola", "calzone", "marinara",
+          "tomato", "basil", "mozzarella", "salami", "spicy", "ham", "pineapple", "olive", "anchovy",
+          "garlic", "truffle", "ricotta", "spinach", "lemonade", "espresso", "tiramisu", "gelato"]
+_SYLLABLES = ["ba", "ca", "do", "fe", "gi", "la", "mo", "na", "pe", "ri", "sa", "ta", "vo", "zu", "chi", "ro"]
+
+def build_vocabulary(size: int, rng: random.Random) -> list[str]:
+    # Real dish words plus generated ones; sampled with Zipf weights so a few words are
+    # everywhere and most are rare, as in a large multi-restaurant menu.
+    words = set(_WORDS)
+    while len(words) < size:
+        words.add("".join(rng.choices(_SYLLABLES, k=rng.randint(2, 4))))
+    return _WORDS + sorted(words - set(_WORDS))
+
+def build_items(count: int, seed: int, vocabulary_size: int) -> list[MenuItemOut]:
+    rng = random.Random(seed)
+    vocabulary = build_vocabulary(vocabulary_size, rng)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    return [
+        MenuItemOut.model_construct(
+            id=item_id,
+            name=" ".join(rng.choices(vocabulary, weights, k=2)).title(),
+            description=" ".join(rng.choices(vocabulary, weights, k=8)),
+            price_cents=900 + item_id % 1000,
+            stock=item_id % 50,
+            is_available=True,
+            category_id=item_id % 20 + 1,
+            image_url=None,
+        ) for item_id in range(1, count + 1)
+    ]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the in-memory menu search index used without Postgres")
+    parser.add_argument("--items", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("queries", nargs="*", default=["pep", "peperoni", "truffle ricotta", "mozarella basil", "t"])
+    args = parser.parse_args()
+
+    items = build_items(args.items, args.seed, args.vocabulary)
+    started = time.perf_counter()
+    index = MenuSearchIndex(items)
+    print(f"index build: {(time.perf_counter() - started) * 1000:10.1f} ms for {args.items} items")
+
+    for query in args.queries:
+        timings = []
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            results = index.search(query, args.limit)
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"{query!r:>24}: {min(timings):8.3f} ms, {len(results)} results")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from back.core.json_bytes import dumps
+from back.db.menu import Category, MenuItem
+from back.models.menu import CategoryOut, MenuItemOut, MenuSnapshot
+from back.models.orders import CartItemResponse, CartResponse
+from back.services.menu import _ITEM_FIELDS
+
+_CATEGORIES_ADAPTER = TypeAdapter(list[CategoryOut])
+
+def build_menu(items: int, categories: int) -> list[Category]:
+    menu = [Category(id=category_id, name=f"Category {category_id}") for category_id in range(1, categories + 1)]
+
+    for item_id in range(1, items + 1):
+        category = menu[item_id % categories]
+        category.items.append(MenuItem(
+            id=item_id,
+            name=f"Item {item_id}",
+            description="Tomato, mozzarella and basil on a thin crust",
+            price_cents=900 + item_id,
+            stock=item_id % 50,
+            is_available=item_id % 7 != 0,
+            category_id=category.id,
+            image_url=f"/static/uploads/menu_items/{item_id}.jpg",
+        ))
+
+    return menu
+
+def encode_before(menu: list[Category]) -> bytes:
+    # model_validate per row, response_model validation again, then the stdlib encoder.
+    categories = [CategoryOut.model_validate(category) for category in menu]
+    validated = _CATEGORIES_ADAPTER.validate_python(categories)
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode()
+
+def encode_after(menu: list[Category]) -> bytes:
+    snapshot = MenuSnapshot.model_construct(categories=[
+        CategoryOut.model_construct(
+            id=category.id,
+            name=category.name,
+            items=[MenuItemOut.model_construct(**{field: getattr(item, field) for field in _ITEM_FIELDS})
+                   for item in category.items],
+        ) for category in menu
+    ])
+    return dumps(snapshot.categories)
+
+def build_cart_rows(items: int) -> list[dict]:
+    return [{
+        "id": line_id,
+        "menu_item_id": line_id,
+        "name": f"Item {line_id}",
+        "quantity": line_id % 5 + 1,
+        "unit_price_cents": 900 + line_id,
+        "line_total_cents": (line_id % 5 + 1) * (900 + line_id),
+        "image_url": f"/static/uploads/menu_items/{line_id}.jpg",
+    } for line_id in range(1, items + 1)]
+
+def encode_cart_before(rows: list[dict]) -> bytes:
+    cart = CartResponse(status="cart", items=[CartItemResponse(**row) for row in rows],
+                        total_price_cents=sum(row["line_total_cents"] for row in rows))
+    return json.dumps(jsonable_encoder(cart), ensure_ascii=False, separators=(",", ":")).encode()
+
+def encode_cart_after(rows: list[dict]) -> bytes:
+    return dumps({"status": "cart", "items": rows, "total_price_cents": sum(row["line_total_cents"] for row in rows)})
+
+def measure_ms(fn, repeats: int) -> float:
+    timings = []
+
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return min(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare menu serialization paths, in milliseconds per 1,000 items")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    menu = build_menu(args.items, args.categories)
+    assert json.loads(encode_before(menu)) == json.loads(encode_after(menu))
+
+    rows = build_cart_rows(args.items)
+    assert json.loads(encode_cart_before(rows)) == json.loads(encode_cart_after(rows))
+
+    cached = {"menu": encode_after(menu), "cart": encode_cart_after(rows)}
+    per_thousand = 1000 / args.items
+    results = {
+        "menu, validate + stdlib json": measure_ms(lambda: encode_before(menu), args.repeats),
+        "menu, model_construct + orjson": measure_ms(lambda: encode_after(menu), args.repeats),
+        "menu, cached bytes": measure_ms(lambda: cached["menu"], args.repeats),
+        "cart, models + stdlib json": measure_ms(lambda: encode_cart_before(rows), args.repeats),
+        "cart, row dicts + orjson": measure_ms(lambda: encode_cart_after(rows), args.repeats),
+        "cart, cached bytes": measure_ms(lambda: cached["cart"], args.repeats),
+    }
+
+    for name, elapsed in results.items():
+        print(f"{name:>32}: {elapsed * per_thousand:8.3f} ms per 1,000 items")
+
+if __name__ == "__main__":
+    main()
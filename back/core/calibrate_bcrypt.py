@@ -0,0 +1,51 @@
+import argparse
+import time
+
+import bcrypt
+
+from back.core.config import BCRYPT_TARGET_MS
+
+MIN_ROUNDS = 10
+MAX_ROUNDS = 16
+
+def measure_rounds_ms(rounds: int, samples: int = 3) -> float:
+    password = b"calibration-password"
+    timings = []
+
+    for _ in range(samples):
+        salt = bcrypt.gensalt(rounds=rounds)
+        started = time.perf_counter()
+        bcrypt.hashpw(password, salt)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return min(timings)
+
+def calibrate(target_ms: int, samples: int = 3) -> tuple[int, dict[int, float]]:
+    results: dict[int, float] = {}
+    chosen = MIN_ROUNDS
+
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        elapsed = measure_rounds_ms(rounds, samples)
+        results[rounds] = elapsed
+
+        if elapsed > target_ms:
+            break
+        chosen = rounds
+
+    return chosen, results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pick the bcrypt cost factor that fits a latency budget on this host")
+    parser.add_argument("--target-ms", type=int, default=BCRYPT_TARGET_MS)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    chosen, results = calibrate(args.target_ms, args.samples)
+
+    for rounds, elapsed in results.items():
+        print(f"rounds={rounds}: {elapsed:.1f} ms")
+
+    print(f"BCRYPT_ROUNDS={chosen}")
+
+if __name__ == "__main__":
+    main()
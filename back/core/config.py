@@ -4,7 +4,58 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATA_BASE_URL =  os.getenv('DATA_BASE_URL', "sqlite:///./main.db")
+DATA_BASE_REPLICA_URL = os.getenv('DATA_BASE_REPLICA_URL')
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', "5"))
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv('REPLICA_HEALTH_CHECK_SECONDS', "5"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', "5"))
+ASYNC_DB_ENABLED = os.getenv('ASYNC_DB_ENABLED', "false").lower() == "true"
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', "5"))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', "10"))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', "30"))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', "1800"))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', "true").lower() == "true"
+DB_POOL_MIN_CONNECTIONS = int(os.getenv('DB_POOL_MIN_CONNECTIONS', "1"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', "0"))
 SECRET_KEY = os.getenv('SECRET_KEY')
 ALGORITHM = os.getenv('ALGORITHM')
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', "30"))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv('TOKEN_CACHE_MAX_SIZE', "10000"))
 
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', "12"))
+BCRYPT_TARGET_MS = int(os.getenv('BCRYPT_TARGET_MS', "250"))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', "2"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', "32"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv('PASSWORD_HASH_RETRY_AFTER_SECONDS', "1"))
+
+LOGIN_RATE_LIMIT_ATTEMPTS = int(os.getenv('LOGIN_RATE_LIMIT_ATTEMPTS', "10"))
+LOGIN_RATE_LIMIT_WINDOW_SECONDS = int(os.getenv('LOGIN_RATE_LIMIT_WINDOW_SECONDS', "60"))
+LOGIN_RATE_LIMIT_BACKEND = os.getenv('LOGIN_RATE_LIMIT_BACKEND', "memory")
+LOGIN_RATE_LIMIT_SQLITE_PATH = os.getenv('LOGIN_RATE_LIMIT_SQLITE_PATH', "./rate_limit.db")
+
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv('PRINCIPAL_CACHE_MAX_SIZE', "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv('PRINCIPAL_CACHE_TTL_SECONDS', "60"))
+
+ORDER_HISTORY_PAGE_SIZE = int(os.getenv('ORDER_HISTORY_PAGE_SIZE', "20"))
+ORDER_HISTORY_MAX_PAGE_SIZE = int(os.getenv('ORDER_HISTORY_MAX_PAGE_SIZE', "100"))
+
+CART_STORE_BACKEND = os.getenv('CART_STORE_BACKEND', "sql")
+CART_TTL_SECONDS = int(os.getenv('CART_TTL_SECONDS', "86400"))
+CART_SNAPSHOT_PATH = os.getenv('CART_SNAPSHOT_PATH', "./cart_snapshot.json")
+CART_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv('CART_SNAPSHOT_INTERVAL_SECONDS', "5"))
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv('IDEMPOTENCY_TTL_SECONDS', "86400"))
+IDEMPOTENCY_CACHE_MAX_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_MAX_SIZE', "100000"))
+IDEMPOTENCY_BACKEND = os.getenv('IDEMPOTENCY_BACKEND', "memory")
+IDEMPOTENCY_SQLITE_PATH = os.getenv('IDEMPOTENCY_SQLITE_PATH', "./idempotency.db")
+
+CART_ABANDON_TTL_SECONDS = int(os.getenv('CART_ABANDON_TTL_SECONDS', "604800"))
+CART_SWEEP_BATCH_SIZE = int(os.getenv('CART_SWEEP_BATCH_SIZE', "500"))
+CART_SWEEP_INTERVAL_SECONDS = int(os.getenv('CART_SWEEP_INTERVAL_SECONDS', "0"))
+
+CART_RESPONSE_CACHE_MAX_SIZE = int(os.getenv('CART_RESPONSE_CACHE_MAX_SIZE', "10000"))
+
+MENU_CACHE_MAX_AGE_SECONDS = float(os.getenv('MENU_CACHE_MAX_AGE_SECONDS', "30"))
+MENU_HTTP_MAX_AGE_SECONDS = int(os.getenv('MENU_HTTP_MAX_AGE_SECONDS', "0"))
+MENU_HTTP_STALE_WHILE_REVALIDATE_SECONDS = int(os.getenv('MENU_HTTP_STALE_WHILE_REVALIDATE_SECONDS', "30"))
+MENU_SEARCH_PAGE_SIZE = int(os.getenv('MENU_SEARCH_PAGE_SIZE', "20"))
+MENU_SEARCH_MAX_PAGE_SIZE = int(os.getenv('MENU_SEARCH_MAX_PAGE_SIZE', "100"))
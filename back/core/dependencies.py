@@ -2,16 +2,23 @@ from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
-from back.db.session import get_db
-from back.db.user import User as UserModel
+from back.db.async_session import SessionRunner, get_session_runner
 from back.crud.user import get_user_by_id
 from back.core.security import decode_access_token
+from back.core.principal_cache import cache_principal, principal_cache, principal_generation
+from back.models.user import UserPrincipal
 
 security = HTTPBearer()
 
-def get_current_user(
+def _load_principal(db: Session, user_id: str) -> UserPrincipal | None:
+    user = get_user_by_id(db, user_id)
+    return UserPrincipal.model_validate(user) if user else None
+
+# Async so a principal cache hit never leaves the event loop; only a miss goes to the
+# database, through the same runner (and session) the route itself uses.
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)) -> UserModel:
+    runner: SessionRunner = Depends(get_session_runner)) -> UserPrincipal:
     
     token = credentials.credentials
     payload = decode_access_token(token)
@@ -23,8 +30,15 @@ def get_current_user(
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    user = get_user_by_id(db, user_id)
-    if not user:
+    principal = principal_cache.get(str(user_id))
+    if principal:
+        return principal
+
+    generation = principal_generation()
+    principal = await runner.read(_load_principal, user_id)
+    if not principal:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return user
+    cache_principal(user_id, principal, generation)
+
+    return principal
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Protocol
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from back.core import metrics
+from back.core.cache import TTLCache
+from back.core.config import IDEMPOTENCY_CACHE_MAX_SIZE, IDEMPOTENCY_TTL_SECONDS
+from back.core.config import IDEMPOTENCY_BACKEND, IDEMPOTENCY_SQLITE_PATH
+
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+
+# A worker that claimed a key and died leaves it pending; others take it over after this.
+PENDING_TIMEOUT_SECONDS = 60
+_PENDING_POLL_SECONDS = 0.05
+
+# Returned by claim() while another process is running the request for the key.
+PENDING = object()
+
+# An outcome is (fingerprint, result, error): the JSON-encoded result, or the
+# (status_code, detail, headers) of a 4xx error.
+Outcome = tuple[str, Any, tuple[int, Any, dict | None] | None]
+
+# claim() returns the stored outcome for the key, PENDING, or None after reserving the key
+# for the caller, who then either stores an outcome or releases the key.
+class IdempotencyStorage(Protocol):
+    def claim(self, key: str) -> Outcome | object | None:
+        ...
+
+    def store(self, key: str, outcome: Outcome) -> None:
+        ...
+
+    def release(self, key: str) -> None:
+        ...
+
+    def stats(self) -> dict:
+        ...
+
+    def reset(self) -> None:
+        ...
+
+class MemoryIdempotencyStorage:
+    # Single process: duplicates in flight are already awaited by IdempotencyStore.
+    def __init__(self, max_size: int, ttl: float):
+        self._results = TTLCache(max_size=max_size, ttl=ttl)
+
+    def claim(self, key: str) -> Outcome | None:
+        return self._results.get(key)
+
+    def store(self, key: str, outcome: Outcome) -> None:
+        self._results.set(key, outcome)
+
+    def release(self, key: str) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return self._results.stats()
+
+    def reset(self) -> None:
+        self._results.clear()
+
+class SQLiteIdempotencyStorage:
+    # Shares outcomes between worker processes on the same host through a local SQLite
+    # file, so a retry that lands on another worker is replayed too.
+    def __init__(self, path: str, ttl: float, prune_every: int = 1000):
+        self.path = path
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._stores = 0
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency_results ("
+                "key TEXT PRIMARY KEY, outcome TEXT, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def claim(self, key: str) -> Outcome | object | None:
+        # Wall clock, not monotonic: expiry times are compared across processes.
+        now = time.time()
+        conn = self._connect()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT outcome, expires_at FROM idempotency_results WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and row[1] > now:
+                conn.execute("COMMIT")
+                if row[0] is None:
+                    return PENDING
+                fingerprint, result, error = json.loads(row[0])
+                return fingerprint, result, tuple(error) if error else None
+
+            conn.execute(
+                "INSERT OR REPLACE INTO idempotency_results (key, outcome, expires_at) VALUES (?, NULL, ?)",
+                (key, now + PENDING_TIMEOUT_SECONDS),
+            )
+            conn.execute("COMMIT")
+
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return None
+
+    def store(self, key: str, outcome: Outcome) -> None:
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO idempotency_results (key, outcome, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(outcome), now + self.ttl),
+        )
+
+        self._stores += 1
+        if self._stores % self.prune_every == 0:
+            conn.execute("DELETE FROM idempotency_results WHERE expires_at <= ?", (now,))
+
+    def release(self, key: str) -> None:
+        self._connect().execute("DELETE FROM idempotency_results WHERE key = ? AND outcome IS NULL", (key,))
+
+    def stats(self) -> dict:
+        return {"size": self._connect().execute("SELECT COUNT(*) FROM idempotency_results").fetchone()[0]}
+
+    def reset(self) -> None:
+        self._connect().execute("DELETE FROM idempotency_results")
+
+class IdempotencyStore:
+    # First outcome per (scope, key): successful results and 4xx errors are replayed for
+    # the TTL. A duplicate that arrives while the first call runs awaits that call.
+    def __init__(self, storage: IdempotencyStorage):
+        self.storage = storage
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def run(self, scope: str, key: str | None, fingerprint: str,
+                  fn: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        if key is None:
+            return await fn(), False
+
+        storage_key = json.dumps([scope, key])
+
+        while True:
+            pending = self._in_flight.get(storage_key)
+            if pending is not None:
+                metrics.increment("idempotency_waits")
+                # The owner stores its outcome before resolving, so the next pass replays it;
+                # an uncached failure lets this caller run the request itself.
+                await asyncio.wait([pending])
+                continue
+
+            # Registered before the claim, so duplicates in this process wait on us while
+            # the storage call runs off the event loop.
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[storage_key] = future
+            try:
+                outcome = await asyncio.to_thread(self.storage.claim, storage_key)
+            except BaseException:
+                self._resolve(storage_key, future)
+                raise
+
+            if outcome is None:
+                break
+
+            self._resolve(storage_key, future)
+            if outcome is not PENDING:
+                return self._replay(outcome, fingerprint), True
+
+            # Another worker owns the key; poll until it stores the outcome or releases it.
+            metrics.increment("idempotency_waits")
+            await asyncio.sleep(_PENDING_POLL_SECONDS)
+
+        stored = False
+        try:
+            result = await fn()
+            await asyncio.to_thread(self.storage.store, storage_key, (fingerprint, jsonable_encoder(result), None))
+            stored = True
+            return result, False
+
+        except HTTPException as e:
+            if e.status_code < 500:
+                error = (e.status_code, jsonable_encoder(e.detail), e.headers)
+                await asyncio.to_thread(self.storage.store, storage_key, (fingerprint, None, error))
+                stored = True
+            raise
+
+        finally:
+            try:
+                if not stored:
+                    await asyncio.to_thread(self.storage.release, storage_key)
+            finally:
+                self._resolve(storage_key, future)
+
+    def _resolve(self, storage_key: str, future: asyncio.Future) -> None:
+        del self._in_flight[storage_key]
+        future.set_result(None)
+
+    def _replay(self, outcome: Outcome, fingerprint: str) -> Any:
+        stored_fingerprint, result, error = outcome
+
+        if stored_fingerprint != fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+
+        metrics.increment("idempotency_replays")
+        if error is not None:
+            status_code, detail, headers = error
+            raise HTTPException(status_code=status_code, detail=detail,
+                                headers={**(headers or {}), IDEMPOTENT_REPLAYED_HEADER: "true"})
+        return result
+
+    def stats(self) -> dict:
+        return {**self.storage.stats(), "in_flight": len(self._in_flight)}
+
+    def reset(self) -> None:
+        self.storage.reset()
+
+def request_fingerprint(*parts: Any) -> str:
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+def _build_storage() -> IdempotencyStorage:
+    if IDEMPOTENCY_BACKEND == "sqlite":
+        return SQLiteIdempotencyStorage(IDEMPOTENCY_SQLITE_PATH, IDEMPOTENCY_TTL_SECONDS)
+    return MemoryIdempotencyStorage(IDEMPOTENCY_CACHE_MAX_SIZE, IDEMPOTENCY_TTL_SECONDS)
+
+idempotency_store = IdempotencyStore(_build_storage())
+metrics.register_collector("idempotency", idempotency_store.stats)
@@ -0,0 +1,18 @@
+from typing import Any
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=_default)
+
+# For payloads the server built itself: the bytes go out as-is, skipping FastAPI's
+# response_model validation and its stdlib JSON encoding.
+def json_response(content: bytes, status_code: int = 200, headers: dict | None = None) -> Response:
+    return Response(content=content, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,23 @@
+import threading
+from collections import defaultdict
+from typing import Callable
+
+_lock = threading.Lock()
+_counters: dict[str, int] = defaultdict(int)
+_collectors: dict[str, Callable[[], dict]] = {}
+
+def increment(name: str, value: int = 1) -> None:
+    with _lock:
+        _counters[name] += value
+
+def register_collector(name: str, collector: Callable[[], dict]) -> None:
+    _collectors[name] = collector
+
+def snapshot() -> dict:
+    with _lock:
+        data: dict = {"counters": dict(_counters)}
+
+    for name, collector in _collectors.items():
+        data[name] = collector()
+
+    return data
@@ -0,0 +1,30 @@
+import threading
+
+from back.core import metrics
+from back.core.cache import TTLCache
+from back.core.config import PRINCIPAL_CACHE_MAX_SIZE, PRINCIPAL_CACHE_TTL_SECONDS
+
+# Per process: invalidate_principal() clears only this worker's entry, so a role change
+# or deactivation reaches the other workers within PRINCIPAL_CACHE_TTL_SECONDS.
+principal_cache = TTLCache(max_size=PRINCIPAL_CACHE_MAX_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+metrics.register_collector("principal_cache", principal_cache.stats)
+
+# Bumped by every invalidation; a principal loaded across a bump may predate the change
+# and is not cached.
+_lock = threading.Lock()
+_generation = 0
+
+def principal_generation() -> int:
+    return _generation
+
+def cache_principal(user_id: int | str, principal, generation: int) -> None:
+    with _lock:
+        if generation == _generation:
+            principal_cache.set(str(user_id), principal)
+
+def invalidate_principal(user_id: int) -> None:
+    global _generation
+
+    with _lock:
+        _generation += 1
+        principal_cache.invalidate(str(user_id))
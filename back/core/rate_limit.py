@@ -0,0 +1,160 @@
+import math
+import sqlite3
+import threading
+import time
+from typing import Protocol
+
+from back.core.config import (
+    LOGIN_RATE_LIMIT_ATTEMPTS,
+    LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+    LOGIN_RATE_LIMIT_BACKEND,
+    LOGIN_RATE_LIMIT_SQLITE_PATH,
+)
+
+# Token-bucket storage: consume() takes one token from the key's bucket and returns 0
+# when allowed, otherwise the seconds until a token becomes available. refund() gives one
+# back, capped at capacity.
+class RateLimitStorage(Protocol):
+    def consume(self, key: str, capacity: int, refill_per_second: float) -> float:
+        ...
+
+    def refund(self, key: str, capacity: int) -> None:
+        ...
+
+    def reset(self) -> None:
+        ...
+
+def _refill(tokens: float, updated_at: float, now: float, capacity: int, refill_per_second: float) -> float:
+    return min(capacity, tokens + (now - updated_at) * refill_per_second)
+
+class MemoryRateLimitStorage:
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, refill_per_second: float) -> float:
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated_at, now, capacity, refill_per_second)
+
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / refill_per_second
+
+            self._buckets[key] = (tokens - 1, now)
+
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, capacity, refill_per_second)
+
+            return 0
+
+    def refund(self, key: str, capacity: int) -> None:
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated_at = self._buckets[key]
+                self._buckets[key] = (min(capacity, tokens + 1), updated_at)
+
+    def _prune(self, now: float, capacity: int, refill_per_second: float) -> None:
+        # Buckets that have refilled completely carry no state worth keeping.
+        full = [
+            key for key, (tokens, updated_at) in self._buckets.items()
+            if _refill(tokens, updated_at, now, capacity, refill_per_second) >= capacity
+        ]
+        for key in full:
+            del self._buckets[key]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+class SQLiteRateLimitStorage:
+    # Shares buckets between worker processes on the same host through a local SQLite file.
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def consume(self, key: str, capacity: int, refill_per_second: float) -> float:
+        # Wall clock, not monotonic: timestamps are compared across processes.
+        now = time.time()
+        conn = self._connect()
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated_at = row if row else (capacity, now)
+            tokens = _refill(tokens, updated_at, now, capacity, refill_per_second)
+
+            retry_after = 0.0
+            if tokens < 1:
+                retry_after = (1 - tokens) / refill_per_second
+            else:
+                tokens -= 1
+
+            conn.execute(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return retry_after
+
+    def refund(self, key: str, capacity: int) -> None:
+        self._connect().execute(
+            "UPDATE rate_limit_buckets SET tokens = MIN(?, tokens + 1) WHERE key = ?", (capacity, key)
+        )
+
+    def reset(self) -> None:
+        self._connect().execute("DELETE FROM rate_limit_buckets")
+
+class RateLimiter:
+    def __init__(self, storage: RateLimitStorage, limit: int, window_seconds: int):
+        self.storage = storage
+        self.limit = limit
+        self.window_seconds = window_seconds
+
+    def hit(self, *keys: str) -> int:
+        retry_after = 0.0
+        refill_per_second = self.limit / self.window_seconds
+
+        for key in keys:
+            retry_after = max(retry_after, self.storage.consume(key, self.limit, refill_per_second))
+
+        return math.ceil(retry_after)
+
+    def refund(self, *keys: str) -> None:
+        for key in keys:
+            self.storage.refund(key, self.limit)
+
+    def reset(self) -> None:
+        self.storage.reset()
+
+def _build_storage() -> RateLimitStorage:
+    if LOGIN_RATE_LIMIT_BACKEND == "sqlite":
+        return SQLiteRateLimitStorage(LOGIN_RATE_LIMIT_SQLITE_PATH)
+    return MemoryRateLimitStorage()
+
+login_rate_limiter = RateLimiter(_build_storage(), LOGIN_RATE_LIMIT_ATTEMPTS, LOGIN_RATE_LIMIT_WINDOW_SECONDS)
@@ -0,0 +1,13 @@
+import re
+
+# Query parsing shared by the Postgres search query and the in-memory search index.
+
+# Letters and digits only, so every token is also safe inside a Postgres tsquery.
+_TOKEN = re.compile(r"[^\W_]+")
+
+def tokenize(text: str | None) -> list[str]:
+    return _TOKEN.findall(text.lower()) if text else []
+
+def prefix_tsquery(tokens: list[str]) -> str:
+    # Every word has to match, each as a prefix: "pep:* & moz:*".
+    return " & ".join(f"{token}:*" for token in tokens)
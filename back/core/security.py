@@ -1,12 +1,34 @@
+import asyncio
 import hashlib
+import multiprocessing
+import threading
+import time
 import bcrypt
 
 import jwt
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 from datetime import datetime, timedelta, timezone
-from back.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from back.core import metrics
+from back.core.cache import TTLCache
+from back.core.config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, TOKEN_CACHE_MAX_SIZE
+from back.core.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE, BCRYPT_ROUNDS
 
-_BCRYPT_ROUNDS = 12
+_BCRYPT_ROUNDS = BCRYPT_ROUNDS
+# Hashes produced by hash_password carry this marker; unmarked hashes are legacy and
+# may be either SHA-256-prehashed or raw-password bcrypt.
+_SCHEME_PREFIX = "sha256_bcrypt$"
+
+class PasswordHasherBusyError(Exception):
+    pass
+
+_hash_executor: ProcessPoolExecutor | None = None
+_hash_executor_lock = threading.Lock()
+_hash_slots = threading.BoundedSemaphore(max(PASSWORD_HASH_WORKERS, 1) + PASSWORD_HASH_QUEUE_SIZE)
+
+# Verified claims keyed by a digest of the token; entries never outlive the token's exp.
+_token_cache = TTLCache(max_size=TOKEN_CACHE_MAX_SIZE, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+metrics.register_collector("token_cache", _token_cache.stats)
 
 def _sha256_hexdigest_bytes(password: str) -> bytes:
     return hashlib.sha256(password.encode()).hexdigest().encode()
@@ -16,19 +38,78 @@ def hash_password(password: str) -> str:
     salt = bcrypt.gensalt(rounds=_BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(prehashed, salt)
 
-    return hashed.decode()
+    return _SCHEME_PREFIX + hashed.decode()
 
 def verify_password(password: str, hashed_password: str) -> bool:
-    hp_bytes = hashed_password.encode()
     prehashed = _sha256_hexdigest_bytes(password)
-    if bcrypt.checkpw(prehashed, hp_bytes):
-        return True
+
+    if hashed_password.startswith(_SCHEME_PREFIX):
+        try:
+            return bcrypt.checkpw(prehashed, hashed_password[len(_SCHEME_PREFIX):].encode())
+
+        except ValueError:
+            return False
+
+    hp_bytes = hashed_password.encode()
     try:
+        if bcrypt.checkpw(prehashed, hp_bytes):
+            return True
         return bcrypt.checkpw(password.encode(), hp_bytes)
     
     except ValueError:
         return False
+
+def needs_rehash(hashed_password: str) -> bool:
+    if not hashed_password.startswith(_SCHEME_PREFIX):
+        return True
+
+    try:
+        rounds = int(hashed_password[len(_SCHEME_PREFIX):].split("$")[2])
+
+    except (IndexError, ValueError):
+        return True
+
+    return rounds != _BCRYPT_ROUNDS
     
+def get_hash_executor() -> ProcessPoolExecutor | None:
+    global _hash_executor
+
+    if PASSWORD_HASH_WORKERS <= 0:
+        return None
+
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            _hash_executor = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _hash_executor
+
+def shutdown_hash_executor() -> None:
+    global _hash_executor
+
+    with _hash_executor_lock:
+        if _hash_executor is not None:
+            _hash_executor.shutdown(wait=False, cancel_futures=True)
+            _hash_executor = None
+
+async def _run_in_hash_pool(func, *args):
+    # Reject immediately instead of queueing without bound behind a login burst.
+    if not _hash_slots.acquire(blocking=False):
+        raise PasswordHasherBusyError("Password hashing pool is saturated")
+
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_hash_executor(), func, *args)
+    finally:
+        _hash_slots.release()
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -38,9 +119,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encode_jwt
 
 def decode_access_token(token: str) -> Optional[dict]:
+    cache_key = hashlib.sha256(token.encode()).digest()
+    cached = _token_cache.get(cache_key)
+
+    if cached is not None:
+        if cached["exp"] > time.time():
+            return dict(cached)
+
+        _token_cache.invalidate(cache_key)
+        return None
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     
     except jwt.InvalidTokenError:
         return None
+
+    expires_in = payload.get("exp", 0) - time.time()
+    if expires_in > 0:
+        _token_cache.set(cache_key, dict(payload), ttl=expires_in)
+
+    return payload
@@ -1,255 +1,460 @@
-from sqlalchemy.orm import Session
+from datetime import datetime
+
+from sqlalchemy import Integer, delete, func, insert, literal, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from back.db.order import Order as OrderModel
 from back.db.order_items import OrderItem as OrderItemModel
-from back.models.orders import AddToCartRequest, CartItemResponse, UpdateCartItemRequest, CartResponse, PlaceOrderResponse, OrderHistoryResponse, OrderHistoryItem
+from back.models.orders import AddToCartRequest, CartOperation, CartItemResponse, UpdateCartItemRequest, CartResponse, PlaceOrderResponse, OrderHistoryResponse, OrderHistoryItem, OrderSummaryResponse, UnavailableLine
 from back.db.menu import MenuItem as MenuItemModel
 from back.db.order import Order as OrderModel
 from back.db.user import User as UserModel
+from back.services.domain_errors import ConflictError, StockUnavailableError, ValidationError
+
+# Statuses shown in order history; carts and abandoned duplicate carts never are.
+PLACED_ORDER_STATUSES = ("placed",)
 
 def create_cart(db: Session, user_id: int) -> OrderModel:
     cart = OrderModel(user_id=user_id, status="cart", total_price_cents=0)
     db.add(cart)
-    db.commit()
+    db.flush()
     db.refresh(cart)
     return cart
 
 def get_cart(db: Session, user_id: int) -> OrderModel | None:
     return db.query(OrderModel).filter(OrderModel.user_id == user_id, OrderModel.status == "cart").first()
 
-def add_item_to_cart(db: Session, user_id: int, item_in: AddToCartRequest) -> CartResponse | None:
-    if item_in.quantity <= 0:
-        return None
-    
+# Keyed by back.db.session.SUPPORTED_DIALECTS, which get_engine enforces at startup.
+_DIALECT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+def _dialect_insert(db: Session):
+    return _DIALECT_INSERTS[db.get_bind().dialect.name]
+
+def get_or_create_cart(db: Session, user_id: int) -> OrderModel:
     cart = get_cart(db, user_id)
+    if cart:
+        return cart
+
+    # uq_orders_user_id_cart allows one open cart per user: when a parallel request
+    # creates it first, this insert does nothing and the lookup below finds theirs.
+    dialect_insert = _dialect_insert(db)
+    db.execute(
+        dialect_insert(OrderModel)
+        .values(user_id=user_id, status="cart", total_price_cents=0)
+        .on_conflict_do_nothing(index_elements=[OrderModel.user_id], index_where=OrderModel.status == "cart")
+    )
+    return get_cart(db, user_id)
+
+def load_cart_item_rows(db: Session, order_id: int) -> list[dict]:
+    # Plain dicts keyed like CartItemResponse, for callers that encode them directly.
+    rows = db.execute(
+        select(
+            OrderItemModel.id,
+            OrderItemModel.menu_item_id,
+            MenuItemModel.name,
+            OrderItemModel.quantity,
+            OrderItemModel.price_cents_snapshot.label("unit_price_cents"),
+            (OrderItemModel.quantity * OrderItemModel.price_cents_snapshot).label("line_total_cents"),
+            MenuItemModel.image_url,
+        )
+        .join(MenuItemModel, MenuItemModel.id == OrderItemModel.menu_item_id)
+        .where(OrderItemModel.order_id == order_id)
+        .order_by(OrderItemModel.id.asc())
+    ).mappings().all()
 
-    if not cart:
-        cart = create_cart(db, user_id)
+    return [dict(row) for row in rows]
 
-    menu_item = db.query(MenuItemModel).filter(MenuItemModel.id == item_in.menu_item_id).first()
+def load_cart_items(db: Session, order_id: int) -> list[CartItemResponse]:
+    return [CartItemResponse(**row) for row in load_cart_item_rows(db, order_id)]
 
-    if not menu_item:
-        return None
-    
-    existing_cart_item = db.query(OrderItemModel).filter(OrderItemModel.order_id == cart.id, OrderItemModel.menu_item_id == item_in.menu_item_id).first()
-    
-    if existing_cart_item:
-        existing_cart_item.quantity += item_in.quantity    
-    else:
-        cart_item = OrderItemModel(
-            order_id=cart.id,
-            menu_item_id=item_in.menu_item_id,
-            quantity=item_in.quantity,
-            price_cents_snapshot=menu_item.price_cents
-        )
-        db.add(cart_item)
+def _lines_total(order_id):
+    return (
+        select(func.coalesce(func.sum(OrderItemModel.quantity * OrderItemModel.price_cents_snapshot), 0))
+        .where(OrderItemModel.order_id == order_id)
+        .scalar_subquery()
+    )
 
-    db.commit()
-    
-    cart_items = db.query(OrderItemModel).filter(OrderItemModel.order_id == cart.id).all()
+def apply_total_delta(db: Session, cart: OrderModel, delta_cents: int) -> int:
+    # Signed in-place adjustment: an O(1) change never re-reads the other lines.
+    total_price_cents = db.execute(
+        update(OrderModel)
+        .where(OrderModel.id == cart.id)
+        .values(total_price_cents=OrderModel.total_price_cents + delta_cents)
+        .returning(OrderModel.total_price_cents)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    set_committed_value(cart, "total_price_cents", total_price_cents)
+
+    return total_price_cents
 
-    cart.total_price_cents = sum(item.quantity * item.price_cents_snapshot for item in cart_items)
+def add_item_to_cart(db: Session, user_id: int, item_in: AddToCartRequest) -> CartResponse | None:
+    if item_in.quantity <= 0:
+        return None
     
-    db.add(cart)
-    db.commit()
-    db.refresh(cart)
+    cart = get_or_create_cart(db, user_id)
+
+    # INSERT ... SELECT from menu_items snapshots the price and yields no row for an
+    # unknown item; ON CONFLICT merges into an existing line in the same statement.
+    insert = _dialect_insert(db)
+    stmt = insert(OrderItemModel).from_select(
+        ["order_id", "menu_item_id", "quantity", "price_cents_snapshot"],
+        select(
+            literal(cart.id, Integer),
+            MenuItemModel.id,
+            literal(item_in.quantity, Integer),
+            MenuItemModel.price_cents,
+        ).where(MenuItemModel.id == item_in.menu_item_id),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OrderItemModel.order_id, OrderItemModel.menu_item_id],
+        set_={"quantity": OrderItemModel.quantity + stmt.excluded.quantity},
+    ).returning(OrderItemModel.price_cents_snapshot)
+
+    # An existing line keeps its original snapshot, so the delta uses the returned price.
+    price_cents_snapshot = db.execute(stmt).scalar()
+    if price_cents_snapshot is None:
+        return None
 
     return CartResponse(
         status=cart.status,
-        items=[
-            CartItemResponse(
-                id=item.id,
-                menu_item_id=item.menu_item_id,
-                name=item.menu_item.name,
-                quantity=item.quantity,
-                unit_price_cents=item.price_cents_snapshot,
-                line_total_cents=item.quantity * item.price_cents_snapshot,
-                image_url=item.menu_item.image_url           
-            ) for item in cart_items
-        ],
-        total_price_cents=cart.total_price_cents
+        items=load_cart_items(db, cart.id),
+        total_price_cents=apply_total_delta(db, cart, item_in.quantity * price_cents_snapshot)
     )
 
 def get_cart_by_user(db: Session, user_id: int) -> CartResponse:
-    cart = (
-        db.query(OrderModel)
-        .filter(OrderModel.user_id == user_id, OrderModel.status == "cart")
-        .first()
-    )
-
+    cart = get_cart(db, user_id)
     if not cart:
         return CartResponse(status="cart", items=[], total_price_cents=0)
 
-    cart_items = (
-        db.query(OrderItemModel)
-        .filter(OrderItemModel.order_id == cart.id)
-        .order_by(OrderItemModel.id.asc())
-        .all()
-    )
-
     return CartResponse(
         status=cart.status,
-        items=[
-            CartItemResponse(
-                id=item.id,
-                menu_item_id=item.menu_item_id,
-                name=item.menu_item.name,
-                quantity=item.quantity,
-                unit_price_cents=item.price_cents_snapshot,
-                line_total_cents=item.quantity * item.price_cents_snapshot,
-                image_url=item.menu_item.image_url,
-            )
-            for item in cart_items
-        ],
+        items=load_cart_items(db, cart.id),
         total_price_cents=cart.total_price_cents,
     )
 
 def list_cart_items(db: Session, user_id: int) -> list[CartItemResponse]: 
-    cart = db.query(OrderModel).filter(OrderModel.user_id == user_id, OrderModel.status == "cart").first()
+    cart = get_cart(db, user_id)
 
     if not cart:
         return []
     
-    cart_items = (
+    return load_cart_items(db, cart.id)
+
+def _locked_lines(db: Session, order_id: int):
+    # Edits compute the total delta from the quantities read here. The row locks keep a
+    # concurrent add-item upsert from landing between that read and the write, where its
+    # quantity would be overwritten while its delta still reached the total; fresh rows
+    # replace any already in the session.
+    return (
         db.query(OrderItemModel)
-        .filter(OrderItemModel.order_id == cart.id)
-        .order_by(OrderItemModel.id.asc())
-        .all()
+        .filter(OrderItemModel.order_id == order_id)
+        .with_for_update()
+        .populate_existing()
     )
-    return [
-        CartItemResponse(
-            id=item.id,
-            menu_item_id=item.menu_item_id,
-            name=item.menu_item.name,
-            quantity=item.quantity,
-            unit_price_cents=item.price_cents_snapshot,
-            line_total_cents=item.quantity * item.price_cents_snapshot,
-            image_url=item.menu_item.image_url
-        ) for item in cart_items
-    ]
-
-
 
 def update_cart_item_quantity(db: Session, user_id: int, item_in: UpdateCartItemRequest) -> CartResponse | None:
     if item_in.quantity < 0:
         return None
     
-    cart = db.query(OrderModel).filter(OrderModel.user_id == user_id, OrderModel.status == "cart").first()
+    cart = get_cart(db, user_id)
 
     if not cart:
         return None
     
-    cart_item = db.query(OrderItemModel).filter(OrderItemModel.order_id == cart.id, OrderItemModel.menu_item_id == item_in.menu_item_id).first()
+    cart_item = _locked_lines(db, cart.id).filter(OrderItemModel.menu_item_id == item_in.menu_item_id).first()
 
     if not cart_item:
         return None
 
+    delta = (item_in.quantity - cart_item.quantity) * cart_item.price_cents_snapshot
+
     if item_in.quantity == 0:
         db.delete(cart_item)
     else:
         cart_item.quantity = item_in.quantity
     
-    db.commit()
-
-    cart_items = db.query(OrderItemModel).filter(OrderItemModel.order_id == cart.id).all()
-    cart.total_price_cents = sum(item.quantity * item.price_cents_snapshot for item in cart_items)
-    db.add(cart)
-    db.commit()
-    db.refresh(cart)
+    db.flush()
 
     return CartResponse(
         status=cart.status,
-        items=[
-            CartItemResponse(
-                id=item.id,
-                menu_item_id=item.menu_item_id,
-                name=item.menu_item.name,
-                quantity=item.quantity,
-                unit_price_cents=item.price_cents_snapshot,
-                line_total_cents=item.quantity * item.price_cents_snapshot,
-                image_url=item.menu_item.image_url
-            ) for item in cart_items
-        ],
-        total_price_cents=cart.total_price_cents
+        items=load_cart_items(db, cart.id),
+        total_price_cents=apply_total_delta(db, cart, delta)
     )
 
-def recalculate_total_price(db: Session, cart: OrderModel) -> None:
-    cart_items = db.query(OrderItemModel).filter(OrderItemModel.order_id == cart.id).all()
-    cart.total_price_cents = sum(item.quantity * item.price_cents_snapshot for item in cart_items)
-    db.add(cart)
-    db.commit()
-    db.refresh(cart)
+def apply_cart_operations(db: Session, user_id: int, operations: list[CartOperation]) -> CartResponse:
+    cart = get_or_create_cart(db, user_id)
+
+    lines = {line.menu_item_id: line for line in _locked_lines(db, cart.id)}
+    added_ids = {op.menu_item_id for op in operations if op.op == "add"} - lines.keys()
+    prices = dict(db.execute(
+        select(MenuItemModel.id, MenuItemModel.price_cents).where(MenuItemModel.id.in_(added_ids))
+    ).all()) if added_ids else {}
+
+    # Edits are folded in memory; the flush below writes each touched line once.
+    delta = 0
+    for index, op in enumerate(operations):
+        line = lines.get(op.menu_item_id)
+
+        if op.op == "add":
+            if op.quantity <= 0 or (line is None and op.menu_item_id not in prices):
+                raise ValidationError(f"Operation {index}: invalid menu item or quantity")
+
+            if line is None:
+                line = OrderItemModel(order_id=cart.id, menu_item_id=op.menu_item_id, quantity=0,
+                                      price_cents_snapshot=prices[op.menu_item_id])
+                lines[op.menu_item_id] = line
+                db.add(line)
+
+            line.quantity += op.quantity
+            delta += op.quantity * line.price_cents_snapshot
+            continue
+
+        if line is None or line.quantity == 0:
+            raise ValidationError(f"Operation {index}: item is not in the cart")
+
+        new_quantity = 0 if op.op == "remove" else op.quantity
+        if new_quantity < 0:
+            raise ValidationError(f"Operation {index}: invalid quantity")
+
+        delta += (new_quantity - line.quantity) * line.price_cents_snapshot
+        line.quantity = new_quantity
+
+    # Emptied lines are dropped only now, so a remove followed by an add reuses the row.
+    for line in lines.values():
+        if line.quantity == 0:
+            if line in db.new:
+                db.expunge(line)
+            else:
+                db.delete(line)
+
+    try:
+        db.flush()
+
+    except IntegrityError:
+        raise ConflictError("Cart was changed concurrently, please retry")
+
+    return CartResponse(
+        status=cart.status,
+        items=load_cart_items(db, cart.id),
+        total_price_cents=apply_total_delta(db, cart, delta)
+    )
 
 def remove_item_from_cart(db: Session, user_id: int, menu_item_id: int) -> CartResponse | None:
-    cart = db.query(OrderModel).filter(OrderModel.user_id == user_id, OrderModel.status == "cart").first()
+    cart = get_cart(db, user_id)
     
     if not cart:
         return None
     
-    cart_item = db.query(OrderItemModel).filter(OrderItemModel.order_id == cart.id, OrderItemModel.menu_item_id == menu_item_id).first()
+    cart_item = _locked_lines(db, cart.id).filter(OrderItemModel.menu_item_id == menu_item_id).first()
     
     if not cart_item:
         return None
     
+    delta = -cart_item.quantity * cart_item.price_cents_snapshot
     db.delete(cart_item)
-    db.commit()
-    
-    recalculate_total_price(db, cart)
+    db.flush()
     
     return CartResponse(
         status=cart.status,
-        items=[
-            CartItemResponse(
-                id=item.id,
-                menu_item_id=item.menu_item_id,
-                name=item.menu_item.name,
-                quantity=item.quantity,
-                unit_price_cents=item.price_cents_snapshot,
-                line_total_cents=item.quantity * item.price_cents_snapshot, 
-                image_url=item.menu_item.image_url
-            ) for item in db.query(OrderItemModel).filter(OrderItemModel.order_id == cart.id).all()
-        ],
-        total_price_cents=cart.total_price_cents
+        items=load_cart_items(db, cart.id),
+        total_price_cents=apply_total_delta(db, cart, delta)
+    )
+
+def find_total_drift(db: Session, limit: int | None = None) -> list[tuple[int, int, int]]:
+    lines_total = func.coalesce(func.sum(OrderItemModel.quantity * OrderItemModel.price_cents_snapshot), 0)
+    stmt = (
+        select(OrderModel.id, OrderModel.total_price_cents, lines_total)
+        .outerjoin(OrderItemModel, OrderItemModel.order_id == OrderModel.id)
+        .group_by(OrderModel.id, OrderModel.total_price_cents)
+        .having(OrderModel.total_price_cents != lines_total)
+        .order_by(OrderModel.id)
+        .limit(limit)
+    )
+    return [tuple(row) for row in db.execute(stmt).all()]
+
+def repair_totals(db: Session, order_ids: list[int]) -> int:
+    if not order_ids:
+        return 0
+
+    result = db.execute(
+        update(OrderModel)
+        .where(OrderModel.id.in_(order_ids))
+        .values(total_price_cents=_lines_total(OrderModel.id))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def _abandoned_before(cutoff: datetime):
+    return OrderModel.status.in_(("cart", "abandoned")) & (OrderModel.updated_at < cutoff)
+
+def find_abandoned_carts(db: Session, cutoff: datetime, limit: int) -> list[int]:
+    stmt = (
+        select(OrderModel.id)
+        .where(_abandoned_before(cutoff))
+        .order_by(OrderModel.id)
+        .limit(limit)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Lock only this batch; carts another sweeper or a live request holds are skipped.
+        stmt = stmt.with_for_update(skip_locked=True)
+    return list(db.execute(stmt).scalars())
+
+def delete_carts(db: Session, order_ids: list[int]) -> tuple[int, int]:
+    if not order_ids:
+        return 0, 0
+
+    lines = db.execute(
+        delete(OrderItemModel)
+        .where(OrderItemModel.order_id.in_(order_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    carts = db.execute(
+        delete(OrderModel)
+        .where(OrderModel.id.in_(order_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    return carts, lines
+
+def reserve_stock(db: Session, order_id: int) -> list[UnavailableLine]:
+    line_quantity = (
+        select(OrderItemModel.quantity)
+        .where(OrderItemModel.order_id == order_id, OrderItemModel.menu_item_id == MenuItemModel.id)
+        .scalar_subquery()
     )
+    line_item_ids = select(OrderItemModel.menu_item_id).where(OrderItemModel.order_id == order_id)
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Lock the cart's rows in id order so two multi-line checkouts cannot deadlock.
+        db.execute(
+            select(MenuItemModel.id)
+            .where(MenuItemModel.id.in_(line_item_ids))
+            .order_by(MenuItemModel.id)
+            .with_for_update()
+        )
+
+    # Conditional decrement for every line in one statement, so a short stock never goes
+    # negative. Like any row lock, the ones taken here (and by the SELECT ... FOR UPDATE
+    # above on Postgres) are held until the checkout transaction commits or rolls back.
+    reserved_ids = set(db.execute(
+        update(MenuItemModel)
+        .where(
+            MenuItemModel.id.in_(line_item_ids),
+            MenuItemModel.is_available,
+            MenuItemModel.stock >= line_quantity,
+        )
+        .values(stock=MenuItemModel.stock - line_quantity)
+        .returning(MenuItemModel.id)
+        .execution_options(synchronize_session=False)
+    ).scalars())
+
+    rows = db.execute(
+        select(OrderItemModel.menu_item_id, MenuItemModel.name, OrderItemModel.quantity,
+               MenuItemModel.stock, MenuItemModel.is_available)
+        .join(MenuItemModel, MenuItemModel.id == OrderItemModel.menu_item_id)
+        .where(OrderItemModel.order_id == order_id, OrderItemModel.menu_item_id.not_in(reserved_ids))
+        .order_by(OrderItemModel.menu_item_id)
+    ).all()
+
+    return [
+        UnavailableLine(
+            menu_item_id=row.menu_item_id,
+            name=row.name,
+            requested=row.quantity,
+            available=row.stock if row.is_available else 0
+        ) for row in rows
+    ]
 
 def place_order(db: Session, user_id: int) -> PlaceOrderResponse | None:
-    cart = db.query(OrderModel).filter(OrderModel.user_id == user_id, OrderModel.status == "cart").first()
+    cart = get_cart(db, user_id)
 
     if not cart:
         return None
     
-    cart_items = db.query(OrderItemModel).filter(OrderItemModel.order_id == cart.id).all()
+    has_items = db.query(OrderItemModel.id).filter(OrderItemModel.order_id == cart.id).first()
 
-    if not cart_items:
+    if not has_items:
         return None
+
+    unavailable = reserve_stock(db, cart.id)
+
+    # Raising makes the unit of work roll back the lines that were reserved.
+    if unavailable:
+        raise StockUnavailableError("Some items are out of stock", unavailable)
     
     cart.status = "placed"
     db.add(cart)
-    db.commit()
-    db.refresh(cart)
+    db.flush()
 
     return PlaceOrderResponse(
         message="Order placed successfully",
         order_id=cart.id
     )
 
+def place_order_from_lines(db: Session, user_id: int, lines: list[tuple[int, int, int]]) -> PlaceOrderResponse:
+    # Checkout for carts kept outside the database: the order and its lines are written
+    # in the same transaction that reserves stock.
+    order = OrderModel(user_id=user_id, status="placed",
+                       total_price_cents=sum(quantity * price for _, quantity, price in lines))
+    db.add(order)
+    db.flush()
+
+    db.execute(insert(OrderItemModel), [
+        {"order_id": order.id, "menu_item_id": menu_item_id, "quantity": quantity, "price_cents_snapshot": price}
+        for menu_item_id, quantity, price in lines
+    ])
+
+    unavailable = reserve_stock(db, order.id)
+
+    if unavailable:
+        raise StockUnavailableError("Some items are out of stock", unavailable)
+
+    return PlaceOrderResponse(
+        message="Order placed successfully",
+        order_id=order.id
+    )
+
 def clear_cart(db: Session, user_id: int) -> CartResponse | None:
-    cart = db.query(OrderModel).filter(OrderModel.user_id == user_id, OrderModel.status == "cart").first()
+    cart = get_cart(db, user_id)
     if not cart:
         return None
     
     db.query(OrderItemModel).filter(OrderItemModel.order_id == cart.id).delete()
     cart.total_price_cents = 0
     db.add(cart)
-    db.commit()
+    db.flush()
     db.refresh(cart)
     
     return CartResponse(status=cart.status, items=[], total_price_cents=0)
 
-def get_orders_by_user(db: Session, user_id: int) -> list[OrderHistoryResponse]:
-    orders = db.query(OrderModel).filter(OrderModel.user_id == user_id, OrderModel.status != "cart").order_by(OrderModel.created_at.desc()).all()
+def get_orders_by_user(db: Session, user_id: int, limit: int,
+                       after: tuple[datetime, int] | None = None,
+                       include_items: bool = True) -> list[OrderHistoryResponse | OrderSummaryResponse]:
+    query = (
+        db.query(OrderModel)
+        .filter(OrderModel.user_id == user_id, OrderModel.status.in_(PLACED_ORDER_STATUSES))
+        .order_by(OrderModel.created_at.desc(), OrderModel.id.desc())
+    )
 
-    if not orders:
-        return []
+    if after is not None:
+        query = query.filter(tuple_(OrderModel.created_at, OrderModel.id) < after)
+
+    if include_items:
+        query = query.options(selectinload(OrderModel.items).joinedload(OrderItemModel.menu_item))
+
+    orders = query.limit(limit).all()
+
+    if not include_items:
+        return [
+            OrderSummaryResponse(
+                order_id=order.id,
+                total_price_cents=order.total_price_cents,
+                created_at=order.created_at.isoformat(),
+                status=order.status
+            ) for order in orders
+        ]
 
     return [
         OrderHistoryResponse(
@@ -1,8 +1,11 @@
-from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, literal, literal_column, or_, select
+from sqlalchemy.orm import Session, contains_eager
 from back.db.menu import Category as CategoryModel
 from back.db.menu import MenuItem as MenuItemModel
+from back.db.menu import SEARCH_DOCUMENT_SQL
 from back.models.menu import CategoryCreate, CategoryUpdate, MenuItemCreate, MenuItemUpdate
 from back.services.domain_errors import NotFoundError, ConflictError, ValidationError
+from back.core.search_text import prefix_tsquery, tokenize
 
 def get_category_by_id(db: Session, category_id: int) -> CategoryModel | None:
     if not category_id:
@@ -19,6 +22,17 @@ def get_category_by_name(db: Session, name: str) -> CategoryModel | None:
 def get_all_categories(db: Session) -> list[CategoryModel]:
     return db.query(CategoryModel).all()
 
+def get_menu_snapshot(db: Session) -> list[CategoryModel]:
+    # Categories and their items in one LEFT JOIN; contains_eager fills category.items
+    # from the joined rows so serialization never lazy-loads.
+    stmt = (
+        select(CategoryModel)
+        .outerjoin(CategoryModel.items)
+        .options(contains_eager(CategoryModel.items))
+        .order_by(CategoryModel.id, MenuItemModel.id)
+    )
+    return list(db.execute(stmt).unique().scalars())
+
 def create_category(db: Session, category_in: CategoryCreate) -> CategoryModel | None:
     existing_category = db.query(CategoryModel).filter(CategoryModel.name ==category_in.name).first()
 
@@ -57,9 +71,6 @@ def update_category(db: Session, category_id: int, category_in: CategoryUpdate)
 
     return category
 
-def get_category_with_items(db: Session, category_id: int) -> CategoryModel | None:
-    return db.query(CategoryModel).options(selectinload(CategoryModel.items)).filter(CategoryModel.id == category_id).first()
-
 def create_item(db: Session, item_in: MenuItemCreate) -> MenuItemModel | None:
     category = db.query(CategoryModel).filter(CategoryModel.id == item_in.category_id).first()
 
@@ -95,19 +106,6 @@ def get_item_by_id(db: Session, item_id: int) -> MenuItemModel | None:
 def get_all_items(db: Session) -> list[MenuItemModel]:
     return db.query(MenuItemModel).order_by(MenuItemModel.id).all()
 
-def get_items_by_category(db: Session, category_id: int) -> list[MenuItemModel] | None:
-    category = db.query(CategoryModel).filter(CategoryModel.id == category_id).first()
-
-    if not category:
-        return None
-
-    return (
-        db.query(MenuItemModel)
-        .filter(MenuItemModel.category_id == category.id)
-        .order_by(MenuItemModel.id.asc())
-        .all()
-    )
-
 def update_item(db: Session, item_id: int, item_in: MenuItemUpdate) -> MenuItemModel | None:
     item = db.query(MenuItemModel).filter(MenuItemModel.id == item_id).first()
 
@@ -176,4 +174,32 @@ def get_item_by_name(db: Session, name: str) -> MenuItemModel | None:
         return None
     
     return db.query(MenuItemModel).filter(MenuItemModel.name == name).first()
+
+def search_items(db: Session, query: str, limit: int, offset: int = 0) -> list[MenuItemModel]:
+    # Postgres only. Both predicates are GIN-indexed, so the planner combines the
+    # tsvector prefix matches and the trigram word matches with a BitmapOr.
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    document = literal_column(SEARCH_DOCUMENT_SQL)
+    tsquery = func.to_tsquery("simple", prefix_tsquery(tokens))
+    phrase = literal(" ".join(tokens))
+
+    name_similarity = func.word_similarity(phrase, MenuItemModel.name)
+    description_similarity = func.coalesce(func.word_similarity(phrase, MenuItemModel.description), 0)
+    rank = func.ts_rank(document, tsquery) + name_similarity * 2 + description_similarity
+
+    stmt = (
+        select(MenuItemModel)
+        .where(or_(
+            document.bool_op("@@")(tsquery),
+            phrase.bool_op("<%")(MenuItemModel.name),
+            phrase.bool_op("<%")(MenuItemModel.description),
+        ))
+        .order_by(rank.desc(), MenuItemModel.name, MenuItemModel.id)
+        .offset(offset)
+        .limit(limit)
+    )
+    return list(db.execute(stmt).scalars())
     
@@ -4,6 +4,7 @@ from back.db.user import User as UserModel
 from back.models.user import User_Create, UserUpdate
 
 from back.core.security import hash_password
+from back.core.principal_cache import invalidate_principal
 
 def get_user_by_email(db: Session, email: str) -> UserModel | None:
     return db.query(UserModel).filter(UserModel.email == email).first()
@@ -17,11 +18,11 @@ def get_user_by_id(db: Session, user_id: int) -> UserModel | None:
 def get_user_by_phone_number(db: Session, phone_number: str) -> UserModel | None:
     return db.query(UserModel).filter(UserModel.phone_number == phone_number).first()
 
-def create_user(db: Session, user_in: User_Create) -> UserModel:
+def create_user(db: Session, user_in: User_Create, hashed_password: str | None = None) -> UserModel:
     user = UserModel(
         username = user_in.username,
         email = user_in.email,
-        hashed_password = hash_password(user_in.password),
+        hashed_password = hashed_password or hash_password(user_in.password),
         phone_number = user_in.phone_number,
     )
     db.add(user)
@@ -39,6 +40,7 @@ def set_admin_role(db: Session, user_id: int) -> UserModel | None:
     user.role = "admin"
     db.commit()
     db.refresh(user)
+    invalidate_principal(user.id)
     return user
 
 def update_user_profile(db: Session, user: UserModel, user_in: UserUpdate) -> UserModel | None:
@@ -49,10 +51,12 @@ def update_user_profile(db: Session, user: UserModel, user_in: UserUpdate) -> Us
     
     db.commit()
     db.refresh(user)
+    invalidate_principal(user.id)
     return user
 
 def update_user_password(db: Session, user: UserModel, new_hashed_password: str) -> UserModel | None:
     user.hashed_password = new_hashed_password
     db.commit()
     db.refresh(user)
+    invalidate_principal(user.id)
     return user
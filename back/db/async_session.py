@@ -0,0 +1,91 @@
+import threading
+from typing import Any, Callable
+
+from fastapi import Depends
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from back.core.config import DATA_BASE_URL, ASYNC_DB_ENABLED
+from back.db.session import engine_options, get_db
+from back.db.unit_of_work import run_in_transaction
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+def async_engine_options(url: str) -> dict:
+    options = engine_options(url)
+    # The async engine brings its own queue pool; keep only the sizing knobs.
+    options.pop("poolclass", None)
+
+    connect_args = options.pop("connect_args", None)
+    if connect_args and "options" in connect_args:
+        timeout = connect_args["options"].removeprefix("-c statement_timeout=")
+        options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+
+    return options
+
+_async_engine: AsyncEngine | None = None
+_async_engine_lock = threading.Lock()
+
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+
+    if _async_engine is None:
+        with _async_engine_lock:
+            if _async_engine is None:
+                _async_engine = create_async_engine(async_database_url(DATA_BASE_URL), **async_engine_options(DATA_BASE_URL))
+                AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+async def dispose_async_engine() -> None:
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Runners let async handlers reuse the sync services unchanged: the async runner executes
+# them on the AsyncSession's greenlet bridge so database I/O yields to the event loop,
+# the sync runner falls back to the AnyIO threadpool. Each run() is one unit of work:
+# a single commit on success, a rollback on any error. read() neither commits nor rolls
+# back; it joins whatever unit of work the request runs next.
+class SyncSessionRunner:
+    def __init__(self, db: Session):
+        self.db = db
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        return await run_in_threadpool(run_in_transaction, self.db, fn, *args)
+
+    async def read(self, fn: Callable[..., Any], *args) -> Any:
+        return await run_in_threadpool(fn, self.db, *args)
+
+class AsyncSessionRunner:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        return await self.db.run_sync(run_in_transaction, fn, *args)
+
+    async def read(self, fn: Callable[..., Any], *args) -> Any:
+        return await self.db.run_sync(fn, *args)
+
+SessionRunner = SyncSessionRunner | AsyncSessionRunner
+
+if ASYNC_DB_ENABLED:
+    def get_session_runner(db: AsyncSession = Depends(get_async_db)) -> AsyncSessionRunner:
+        return AsyncSessionRunner(db)
+else:
+    def get_session_runner(db: Session = Depends(get_db)) -> SyncSessionRunner:
+        return SyncSessionRunner(db)
@@ -0,0 +1,70 @@
+import logging
+
+from sqlalchemy import Engine, delete, func, select, update
+
+from back.db.base import Base
+from back.db.session import get_engine
+
+from back.db.user import User
+from back.db.menu import Category, MenuItem
+from back.db.order import Order
+from back.db.order_items import OrderItem
+
+logger = logging.getLogger(__name__)
+
+def _close_duplicate_carts(engine: Engine) -> None:
+    # Older databases may hold several open carts per user, which would block
+    # uq_orders_user_id_cart; keep the newest one and mark the rest abandoned.
+    newest = (
+        select(func.max(Order.id))
+        .where(Order.status == "cart")
+        .group_by(Order.user_id)
+    )
+    with engine.begin() as conn:
+        closed = conn.execute(
+            update(Order)
+            .where(Order.status == "cart", Order.id.not_in(newest))
+            .values(status="abandoned")
+        ).rowcount
+
+    if closed:
+        logger.warning("Marked %s duplicate carts as abandoned", closed)
+
+def _merge_duplicate_order_lines(engine: Engine) -> None:
+    # Older databases may hold several lines for one menu item in an order, which would
+    # block uq_order_items_order_id_menu_item_id; fold each group into its first line.
+    duplicates = (
+        select(OrderItem.order_id, OrderItem.menu_item_id, func.min(OrderItem.id), func.sum(OrderItem.quantity))
+        .group_by(OrderItem.order_id, OrderItem.menu_item_id)
+        .having(func.count() > 1)
+    )
+    with engine.begin() as conn:
+        groups = conn.execute(duplicates).all()
+        for order_id, menu_item_id, keep_id, quantity in groups:
+            conn.execute(update(OrderItem).where(OrderItem.id == keep_id).values(quantity=quantity))
+            conn.execute(
+                delete(OrderItem)
+                .where(OrderItem.order_id == order_id, OrderItem.menu_item_id == menu_item_id, OrderItem.id != keep_id)
+            )
+
+    if groups:
+        logger.warning("Merged duplicate lines for %s order items", len(groups))
+
+def init_db(engine: Engine | None = None) -> None:
+    engine = engine or get_engine()
+    Base.metadata.create_all(bind=engine)
+    _close_duplicate_carts(engine)
+    _merge_duplicate_order_lines(engine)
+
+    # create_all skips tables that already exist, so indexes added to existing
+    # models have to be created separately.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+if __name__ == "__main__":
+    from back.core.logs import setup_logging
+
+    setup_logging()
+    init_db()
+    logger.info("Database schema is up to date")
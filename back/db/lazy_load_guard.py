@@ -0,0 +1,24 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+class LazyLoadError(RuntimeError):
+    pass
+
+def _raise_on_lazy_load(orm_execute_state: ORMExecuteState) -> None:
+    if not orm_execute_state.is_select:
+        return
+
+    state = orm_execute_state.lazy_loaded_from
+    if state is not None:
+        raise LazyLoadError(f"Lazy load emitted from {state.class_.__name__}; load it eagerly in the query")
+
+# Test-mode guard: any relationship lazy load that reaches the database raises.
+@contextmanager
+def forbid_lazy_loads():
+    event.listen(Session, "do_orm_execute", _raise_on_lazy_load)
+    try:
+        yield
+    finally:
+        event.remove(Session, "do_orm_execute", _raise_on_lazy_load)
@@ -1,5 +1,5 @@
 from back.db.base import Base
-from sqlalchemy import String, Integer, ForeignKey, Text, Boolean
+from sqlalchemy import DDL, String, Integer, ForeignKey, Text, Boolean, Index, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 class Category(Base):
@@ -10,11 +10,23 @@ class Category(Base):
 
     items: Mapped[list["MenuItem"]] = relationship(back_populates="category", cascade="all, delete-orphan")
 
+# Menu search on Postgres: the tsvector index serves prefix matches, the trigram indexes
+# serve typo-tolerant ones. Queries must repeat this expression for the planner to use it.
+SEARCH_DOCUMENT_SQL = "to_tsvector('simple', name || ' ' || coalesce(description, ''))"
+
 class MenuItem(Base):
     __tablename__ = "menu_items"
+    __table_args__ = (
+        Index("ix_menu_items_search_document", text(SEARCH_DOCUMENT_SQL),
+              postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index("ix_menu_items_name_trgm", "name", postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        Index("ix_menu_items_description_trgm", "description", postgresql_using="gin",
+              postgresql_ops={"description": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str] = mapped_column(nullable=False)
+    name: Mapped[str] = mapped_column(nullable=False, index=True)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     price_cents: Mapped[int] = mapped_column(Integer, nullable=False)
     stock: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -25,4 +37,5 @@ class MenuItem(Base):
 
     category: Mapped["Category"] = relationship(back_populates="items")
 
-
+event.listen(Base.metadata, "before_create",
+             DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
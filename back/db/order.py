@@ -1,10 +1,18 @@
 from back.db.base import Base
 from datetime import datetime
-from sqlalchemy import Integer, ForeignKey, String, DateTime
+from sqlalchemy import Integer, ForeignKey, String, DateTime, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Serves keyset pagination of order history on (created_at, id) per user.
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_orders_user_id_status", "user_id", "status"),
+        # At most one open cart per user; get_or_create_cart relies on it.
+        Index("uq_orders_user_id_cart", "user_id", unique=True,
+              postgresql_where=text("status = 'cart'"), sqlite_where=text("status = 'cart'")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
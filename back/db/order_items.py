@@ -1,10 +1,14 @@
 from back.db.base import Base
 from datetime import datetime
-from sqlalchemy import Integer, ForeignKey, String, DateTime
+from sqlalchemy import Integer, ForeignKey, String, DateTime, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        # One line per menu item in an order; add-to-cart upserts against it.
+        Index("uq_order_items_order_id_menu_item_id", "order_id", "menu_item_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     order_id: Mapped[int] = mapped_column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+
+class InstrumentedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.waiting = 0
+        self.waits = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.checkout_ms_total = 0.0
+        self.checkout_ms_max = 0.0
+
+    def _would_block(self) -> bool:
+        # Same condition QueuePool uses to wait: no idle connection and no overflow left.
+        return (
+            self.checkedin() == 0
+            and self._max_overflow > -1
+            and self._overflow >= self._max_overflow
+        )
+
+    def _do_get(self):
+        blocked = self._would_block()
+        if blocked:
+            with self._stats_lock:
+                self.waiting += 1
+                self.waits += 1
+
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._stats_lock:
+                if blocked:
+                    self.waiting -= 1
+                self.checkouts += 1
+                self.checkout_ms_total += elapsed_ms
+                self.checkout_ms_max = max(self.checkout_ms_max, elapsed_ms)
+
+def pool_stats(pool: Pool) -> dict:
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+
+    stats = {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+    }
+
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            stats.update(
+                waiting=pool.waiting,
+                waits=pool.waits,
+                checkouts=pool.checkouts,
+                timeouts=pool.timeouts,
+                checkout_ms_avg=pool.checkout_ms_total / pool.checkouts if pool.checkouts else 0.0,
+                checkout_ms_max=pool.checkout_ms_max,
+            )
+
+    return stats
+
+def warm_up_pool(engine: Engine, connections: int) -> None:
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar, Token
+
+from sqlalchemy import Engine, create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from back.core import metrics
+from back.core.config import DATA_BASE_REPLICA_URL, REPLICA_MAX_LAG_SECONDS, REPLICA_HEALTH_CHECK_SECONDS
+from back.core.config import READ_YOUR_WRITES_SECONDS
+from back.db.pool import pool_stats
+from back.db.session import engine_options
+
+# Replica selection without any web framework imports, so services can call mark_write.
+logger = logging.getLogger(__name__)
+
+REPLICA_URL = DATA_BASE_REPLICA_URL
+
+_POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_is_in_recovery() "
+    "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "ELSE 0 END"
+)
+
+_lock = threading.Lock()
+_replica_engine: Engine | None = None
+# Replica sessions carry this in Session.info, so caches can tell what a read may have missed.
+REPLICA_SESSION_INFO = {"replica": True}
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, info=REPLICA_SESSION_INFO)
+
+_health = {"healthy": False, "checked_at": 0.0, "lag_seconds": None}
+_routing = {"replica": 0, "primary": 0}
+
+# Scopes ("user:<id>", "menu") written by the current request. The HTTP layer hands the
+# client a read-your-writes deadline when this is non-empty, and the client sends it
+# back, so stickiness holds whichever worker serves the next read.
+_request_writes: ContextVar[set[str] | None] = ContextVar("request_writes", default=None)
+
+def get_replica_engine() -> Engine | None:
+    global _replica_engine
+
+    if not REPLICA_URL:
+        return None
+
+    if _replica_engine is None:
+        with _lock:
+            if _replica_engine is None:
+                _replica_engine = create_engine(REPLICA_URL, **engine_options(REPLICA_URL))
+                ReplicaSessionLocal.configure(bind=_replica_engine)
+    return _replica_engine
+
+def _measure_lag(engine: Engine) -> float:
+    with engine.connect() as connection:
+        if engine.dialect.name == "postgresql":
+            return float(connection.execute(_POSTGRES_LAG_QUERY).scalar() or 0)
+
+        connection.execute(text("SELECT 1"))
+        return 0.0
+
+def replica_healthy() -> bool:
+    engine = get_replica_engine()
+    if engine is None:
+        return False
+
+    now = time.monotonic()
+    if now - _health["checked_at"] < REPLICA_HEALTH_CHECK_SECONDS:
+        return _health["healthy"]
+
+    try:
+        lag = _measure_lag(engine)
+        healthy = lag <= REPLICA_MAX_LAG_SECONDS
+        if not healthy:
+            logger.warning("Replica lag %.1fs exceeds %.1fs, reading from primary", lag, REPLICA_MAX_LAG_SECONDS)
+
+    except Exception:
+        logger.exception("Replica health check failed, reading from primary")
+        lag, healthy = None, False
+
+    _health.update(healthy=healthy, checked_at=now, lag_seconds=lag)
+    return healthy
+
+def track_writes() -> Token:
+    return _request_writes.set(set())
+
+def tracked_writes(token: Token) -> set[str]:
+    writes = _request_writes.get() or set()
+    _request_writes.reset(token)
+    return writes
+
+def mark_write(scope: str) -> None:
+    writes = _request_writes.get()
+    if REPLICA_URL and writes is not None:
+        writes.add(scope)
+
+def read_your_writes_until() -> float:
+    # Wall clock: the deadline is compared by whichever process serves the next read.
+    return time.time() + READ_YOUR_WRITES_SECONDS
+
+def primary_pinned(until: str | None) -> bool:
+    if not until:
+        return False
+
+    try:
+        deadline = float(until)
+    except ValueError:
+        return False
+
+    # A deadline further out than one window did not come from us; ignore it.
+    now = time.time()
+    return now < deadline <= now + READ_YOUR_WRITES_SECONDS
+
+def is_replica_session(db) -> bool:
+    return db.info.get("replica", False)
+
+def use_replica(pinned: bool = False) -> bool:
+    use = not pinned and replica_healthy()
+    _routing["replica" if use else "primary"] += 1
+    return use
+
+def reset() -> None:
+    global _replica_engine
+
+    with _lock:
+        if _replica_engine is not None:
+            _replica_engine.dispose()
+        _replica_engine = None
+    _health.update(healthy=False, checked_at=0.0, lag_seconds=None)
+
+def dispose_replica_engine() -> None:
+    if _replica_engine is not None:
+        _replica_engine.dispose()
+
+def _replica_stats() -> dict:
+    stats = {"configured": bool(REPLICA_URL), "routed": dict(_routing), **_health}
+    if _replica_engine is not None:
+        stats["pool"] = pool_stats(_replica_engine.pool)
+    return stats
+
+metrics.register_collector("db_replica", _replica_stats)
@@ -0,0 +1,123 @@
+import threading
+from typing import Callable
+
+from fastapi import Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from back.core.config import READ_YOUR_WRITES_SECONDS, ASYNC_DB_ENABLED
+from back.db import read_routing
+from back.db.async_session import AsyncSessionLocal, AsyncSessionRunner, SyncSessionRunner, SessionRunner
+from back.db.async_session import async_database_url, async_engine_options, get_async_engine
+from back.db.read_routing import REPLICA_SESSION_INFO, ReplicaSessionLocal, primary_pinned, read_your_writes_until
+from back.db.read_routing import track_writes, tracked_writes, use_replica
+from back.db.session import SessionLocal, get_engine
+
+# A request that wrote hands the client this deadline; until it passes, the client's
+# reads go to the primary. Browsers on the same site return the cookie; cross-origin
+# and API clients echo the header.
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes-Until"
+READ_YOUR_WRITES_COOKIE = "read_your_writes_until"
+
+_lock = threading.Lock()
+_async_replica_engine: AsyncEngine | None = None
+AsyncReplicaSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False, info=REPLICA_SESSION_INFO)
+
+def get_async_replica_engine() -> AsyncEngine | None:
+    global _async_replica_engine
+
+    url = read_routing.REPLICA_URL
+    if not url:
+        return None
+
+    if _async_replica_engine is None:
+        with _lock:
+            if _async_replica_engine is None:
+                _async_replica_engine = create_async_engine(async_database_url(url), **async_engine_options(url))
+                AsyncReplicaSessionLocal.configure(bind=_async_replica_engine)
+    return _async_replica_engine
+
+def reset() -> None:
+    global _async_replica_engine
+
+    read_routing.reset()
+    with _lock:
+        _async_replica_engine = None
+
+async def dispose_replica_engines() -> None:
+    read_routing.dispose_replica_engine()
+    if _async_replica_engine is not None:
+        await _async_replica_engine.dispose()
+
+async def read_your_writes_middleware(request: Request, call_next):
+    token = track_writes()
+    try:
+        response = await call_next(request)
+    finally:
+        writes = tracked_writes(token)
+
+    if writes:
+        until = f"{read_your_writes_until():.3f}"
+        response.headers[READ_YOUR_WRITES_HEADER] = until
+        response.set_cookie(READ_YOUR_WRITES_COOKIE, until, max_age=int(READ_YOUR_WRITES_SECONDS) + 1,
+                            httponly=True, samesite="lax")
+    return response
+
+def _pinned_to_primary(request: Request) -> bool:
+    return primary_pinned(request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(READ_YOUR_WRITES_COOKIE))
+
+def _open_read_session(pinned: bool) -> Session:
+    if use_replica(pinned):
+        return ReplicaSessionLocal()
+
+    get_engine()
+    return SessionLocal()
+
+def get_read_db(request: Request):
+    db = _open_read_session(_pinned_to_primary(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+# The read-your-writes window belongs to the client, so user-scoped reads route the same
+# way as menu reads; the separate name keeps routers explicit about what they read.
+get_user_read_db = get_read_db
+
+async def _async_read_db(pinned: bool):
+    if await run_in_threadpool(use_replica, pinned):
+        get_async_replica_engine()
+        session_factory = AsyncReplicaSessionLocal
+    else:
+        get_async_engine()
+        session_factory = AsyncSessionLocal
+
+    async with session_factory() as db:
+        yield db
+
+if ASYNC_DB_ENABLED:
+    async def get_read_session_runner(request: Request):
+        async for db in _async_read_db(_pinned_to_primary(request)):
+            yield AsyncSessionRunner(db)
+else:
+    def get_read_session_runner(db: Session = Depends(get_read_db)) -> SessionRunner:
+        return SyncSessionRunner(db)
+
+get_user_read_session_runner = get_read_session_runner
+
+# For reads backed by a cache that can know it is ahead of the replica: while
+# pin_primary() holds, they go to the primary whatever the client's window says.
+def pinned_read_session_runner(pin_primary: Callable[[], bool]):
+    if ASYNC_DB_ENABLED:
+        async def dependency(request: Request):
+            async for db in _async_read_db(_pinned_to_primary(request) or pin_primary()):
+                yield AsyncSessionRunner(db)
+    else:
+        def dependency(request: Request):
+            db = _open_read_session(_pinned_to_primary(request) or pin_primary())
+            try:
+                yield SyncSessionRunner(db)
+            finally:
+                db.close()
+    return dependency
@@ -1,24 +1,75 @@
-from sqlalchemy import create_engine
+import threading
+
+from sqlalchemy import Engine, create_engine
 from sqlalchemy.orm import sessionmaker
-from back.db.base import Base
 
-from back.core.config import DATA_BASE_URL
+from back.core import metrics
+from back.core.config import DATA_BASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE
+from back.core.config import DB_POOL_PRE_PING, DB_POOL_MIN_CONNECTIONS, DB_STATEMENT_TIMEOUT_MS
+from back.db.pool import InstrumentedQueuePool, pool_stats, warm_up_pool
+
+# Upserts and row locking are written for these two; anything else is refused at
+# startup instead of failing on the first cart request.
+SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+
+class UnsupportedDatabaseError(RuntimeError):
+    pass
+
+def check_dialect(engine: Engine) -> None:
+    if engine.dialect.name not in SUPPORTED_DIALECTS:
+        raise UnsupportedDatabaseError(
+            f"Database dialect {engine.dialect.name!r} is not supported; use one of {', '.join(SUPPORTED_DIALECTS)}"
+        )
+
+def engine_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+
+    # In-memory SQLite lives inside a single connection, so there is no pool to size.
+    if url == "sqlite://" or ":memory:" in url:
+        return options
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+
+    if url.startswith("postgresql") and DB_STATEMENT_TIMEOUT_MS > 0:
+        options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+
+    return options
+
+# The engine is created on first use so importing the app never touches the database.
+# Schema creation lives in back.db.init_db.
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
-from back.db.user import User
-from back.db.menu import Category, MenuItem
-from back.db.order import Order
-from back.db.order_items import OrderItem
+def get_engine() -> Engine:
+    global _engine
 
-engine = create_engine(DATA_BASE_URL)
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(DATA_BASE_URL, **engine_options(DATA_BASE_URL))
+                check_dialect(engine)
+                _engine = engine
+                SessionLocal.configure(bind=_engine)
+    return _engine
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+metrics.register_collector("db_pool", lambda: pool_stats(_engine.pool) if _engine else {})
 
-Base.metadata.create_all(bind=engine)
 
+def warm_up() -> None:
+    warm_up_pool(get_engine(), min(DB_POOL_MIN_CONNECTIONS, DB_POOL_SIZE))
 
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
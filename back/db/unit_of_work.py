@@ -0,0 +1,35 @@
+from typing import Any, Callable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from back.core import metrics
+
+# Per-session counters; tests read them to catch handlers that commit more than once.
+FLUSH_COUNT = "flush_count"
+COMMIT_COUNT = "commit_count"
+
+@event.listens_for(Session, "after_flush")
+def _count_flush(session: Session, flush_context) -> None:
+    session.info[FLUSH_COUNT] = session.info.get(FLUSH_COUNT, 0) + 1
+    metrics.increment("db_flushes")
+
+@event.listens_for(Session, "after_commit")
+def _count_commit(session: Session) -> None:
+    session.info[COMMIT_COUNT] = session.info.get(COMMIT_COUNT, 0) + 1
+    metrics.increment("db_commits")
+
+def reset_counters(session: Session) -> None:
+    session.info[FLUSH_COUNT] = 0
+    session.info[COMMIT_COUNT] = 0
+
+def run_in_transaction(db: Session, fn: Callable[..., Any], *args) -> Any:
+    # crud functions only flush; the whole service call commits once or rolls back.
+    try:
+        result = fn(db, *args)
+        db.commit()
+        return result
+
+    except Exception:
+        db.rollback()
+        raise
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+import back.crud.cart as cart_crud
+from back.core import metrics
+from back.core.config import CART_ABANDON_TTL_SECONDS, CART_SWEEP_BATCH_SIZE, CART_SWEEP_INTERVAL_SECONDS
+from back.db.session import SessionLocal, get_engine
+
+logger = logging.getLogger(__name__)
+
+def sweep_abandoned_carts(db: Session, ttl_seconds: int = CART_ABANDON_TTL_SECONDS,
+                          batch_size: int = CART_SWEEP_BATCH_SIZE, max_batches: int | None = None) -> dict:
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+    result = {"carts": 0, "lines": 0, "batches": 0}
+
+    # One short transaction per batch keeps row locks brief next to live traffic.
+    while max_batches is None or result["batches"] < max_batches:
+        order_ids = cart_crud.find_abandoned_carts(db, cutoff, batch_size)
+        if not order_ids:
+            break
+
+        carts, lines = cart_crud.delete_carts(db, order_ids)
+        db.commit()
+
+        result["carts"] += carts
+        result["lines"] += lines
+        result["batches"] += 1
+
+        if len(order_ids) < batch_size:
+            break
+
+    metrics.increment("abandoned_carts_deleted", result["carts"])
+    metrics.increment("abandoned_cart_lines_deleted", result["lines"])
+    return result
+
+def _sweep_once() -> dict:
+    get_engine()
+    with SessionLocal() as db:
+        return sweep_abandoned_carts(db)
+
+async def run_cart_sweeper(interval_seconds: int = CART_SWEEP_INTERVAL_SECONDS) -> None:
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            result = await run_in_threadpool(_sweep_once)
+            logger.info("Abandoned cart sweep: %s carts and %s lines deleted in %s batches",
+                        result["carts"], result["lines"], result["batches"])
+
+        except Exception:
+            logger.exception("Abandoned cart sweep failed")
+
+def start_cart_sweeper() -> asyncio.Task | None:
+    if CART_SWEEP_INTERVAL_SECONDS <= 0:
+        return None
+    return asyncio.create_task(run_cart_sweeper())
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delete carts that have not been touched for the configured TTL")
+    parser.add_argument("--ttl-seconds", type=int, default=CART_ABANDON_TTL_SECONDS)
+    parser.add_argument("--batch-size", type=int, default=CART_SWEEP_BATCH_SIZE)
+    parser.add_argument("--max-batches", type=int, default=None)
+    args = parser.parse_args()
+
+    get_engine()
+    with SessionLocal() as db:
+        result = sweep_abandoned_carts(db, args.ttl_seconds, args.batch_size, args.max_batches)
+
+    logger.info("Abandoned cart sweep: %s carts and %s lines deleted in %s batches",
+                result["carts"], result["lines"], result["batches"])
+
+if __name__ == "__main__":
+    from back.core.logs import setup_logging
+
+    setup_logging()
+    main()
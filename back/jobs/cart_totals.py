@@ -0,0 +1,41 @@
+import argparse
+import logging
+
+from sqlalchemy.orm import Session
+
+import back.crud.cart as cart_crud
+from back.db.session import SessionLocal, get_engine
+
+logger = logging.getLogger(__name__)
+
+def check_cart_totals(db: Session, repair: bool = False, batch_size: int = 500) -> dict:
+    drifted = cart_crud.find_total_drift(db)
+
+    for order_id, stored, actual in drifted:
+        logger.warning("Order ID %s total drifted: stored %s, lines sum to %s", order_id, stored, actual)
+
+    repaired = 0
+    if repair:
+        order_ids = [order_id for order_id, _, _ in drifted]
+        for start in range(0, len(order_ids), batch_size):
+            repaired += cart_crud.repair_totals(db, order_ids[start:start + batch_size])
+            db.commit()
+
+    return {"drifted": len(drifted), "repaired": repaired}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Find, and optionally repair, orders whose total does not match their lines")
+    parser.add_argument("--repair", action="store_true")
+    args = parser.parse_args()
+
+    get_engine()
+    with SessionLocal() as db:
+        result = check_cart_totals(db, repair=args.repair)
+
+    logger.info("Cart total check: %s drifted, %s repaired", result["drifted"], result["repaired"])
+
+if __name__ == "__main__":
+    from back.core.logs import setup_logging
+
+    setup_logging()
+    main()
@@ -37,6 +37,15 @@ class CategoryOut(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class MenuSnapshot(BaseModel):
+    categories: list[CategoryOut]
+
+    model_config = ConfigDict(from_attributes=True)
+
+class MenuSearchPage(BaseModel):
+    items: list[MenuItemOut]
+    next_offset: int | None = None
+
 class CategoryCreate(BaseModel):
     name: str
 
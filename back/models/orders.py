@@ -1,4 +1,6 @@
-from pydantic import BaseModel, ConfigDict
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field
 
 class AddToCartRequest(BaseModel):
     menu_item_id: int
@@ -12,6 +14,18 @@ class UpdateCartItemRequest(BaseModel):
     
     model_config = ConfigDict(from_attributes=True)
 
+class CartOperation(BaseModel):
+    op: Literal["add", "set", "remove"]
+    menu_item_id: int
+    quantity: int = 1
+
+    model_config = ConfigDict(from_attributes=True)
+
+class CartBatchRequest(BaseModel):
+    operations: list[CartOperation] = Field(min_length=1, max_length=100)
+
+    model_config = ConfigDict(from_attributes=True)
+
 class CartItemResponse(BaseModel):
     id: int
     menu_item_id: int
@@ -36,6 +50,14 @@ class PlaceOrderResponse(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
+class UnavailableLine(BaseModel):
+    menu_item_id: int
+    name: str
+    requested: int
+    available: int
+
+    model_config = ConfigDict(from_attributes=True)
+
 class OrderHistoryItem(BaseModel):
     order_id: int
     product_name: str
@@ -44,11 +66,21 @@ class OrderHistoryItem(BaseModel):
 
     model_config = ConfigDict(from_attributes=True)
 
-class OrderHistoryResponse(BaseModel):
+class OrderSummaryResponse(BaseModel):
     order_id: int
-    items: list[OrderHistoryItem]
     total_price_cents: int
     created_at: str
     status: str
 
     model_config = ConfigDict(from_attributes=True)
+
+class OrderHistoryResponse(OrderSummaryResponse):
+    items: list[OrderHistoryItem]
+
+    model_config = ConfigDict(from_attributes=True)
+
+class OrderHistoryPage(BaseModel):
+    orders: list[OrderHistoryResponse | OrderSummaryResponse]
+    next_cursor: str | None = None
+
+    model_config = ConfigDict(from_attributes=True)
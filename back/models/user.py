@@ -75,5 +75,9 @@ class ChangePasswordRequest(BaseModel):
 
         return value
 
+class UserPrincipal(BaseModel):
+    id: int
+    username: str
+    role: str
 
-
+    model_config = ConfigDict(from_attributes=True, frozen=True)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from back.db.session import get_db
 from back.models.user import User_Create, User_Out, User_Login
@@ -13,10 +13,10 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/register", response_model=Token_Response)
-def register(user_in: User_Create, db: Session = Depends(get_db)) -> Token_Response:
+async def register(user_in: User_Create, db: Session = Depends(get_db)) -> Token_Response:
     service = UserService(db)
     try:
-        user = service.register_user(user_in)
+        user = await service.register_user_async(user_in)
         access_token = create_access_token(data={"sub": str(user.id), "role": user.role})
         logger.info("User registered successfully: %s", user_in.email)
         return Token_Response(
@@ -33,10 +33,11 @@ def register(user_in: User_Create, db: Session = Depends(get_db)) -> Token_Respo
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @router.post("/login", response_model=Token_Response)
-def login(user_log: User_Login, db: Session = Depends(get_db)):
+async def login(user_log: User_Login, request: Request, db: Session = Depends(get_db)):
     service = UserService(db)
+    client_ip = request.client.host if request.client else None
     try:
-        user = service.login_user(user_log.email, user_log.password)
+        user = await service.login_user_async(user_log.email, user_log.password, client_ip)
         access_token = create_access_token(data={"sub": str(user.id), "role": user.role})
         logger.info("User logged in successfully: %s", user_log.email)
         return Token_Response(
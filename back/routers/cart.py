@@ -1,26 +1,24 @@
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from back.db.session import get_db
-from back.db.user import User as UserModel
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from back.core.json_bytes import json_response
+from back.core.idempotency import IDEMPOTENT_REPLAYED_HEADER, idempotency_store, request_fingerprint
+from back.core.config import ORDER_HISTORY_PAGE_SIZE, ORDER_HISTORY_MAX_PAGE_SIZE
+from back.db.async_session import SessionRunner, get_session_runner
+from back.db.replica import get_user_read_session_runner
+from back.models.user import UserPrincipal
 from back.core.dependencies import get_current_user
-from back.services.domain_errors import NotFoundError, ValidationError, ConflictError
+from back.services.domain_errors import NotFoundError, ValidationError, ConflictError, StockUnavailableError
 from back.services.cart import CartService
 import logging
-from back.models.orders import AddToCartRequest, UpdateCartItemRequest, CartResponse, PlaceOrderResponse, OrderHistoryResponse
+from back.models.orders import AddToCartRequest, CartBatchRequest, UpdateCartItemRequest, CartResponse, PlaceOrderResponse, OrderHistoryPage
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/cart", tags=["cart"])
 
-@router.post("/add-item", response_model=CartResponse)
-def add_item_to_cart(item_in: AddToCartRequest,
-                     db: Session = Depends(get_db),
-                     current_user: UserModel = Depends(get_current_user)) -> CartResponse:
-    service = CartService(db)
-
+async def _add_item(runner: SessionRunner, current_user: UserPrincipal, item_in: AddToCartRequest) -> CartResponse:
     try:
-        cart_response = service.add_item_to_cart(current_user.id, item_in)
+        cart_response = await runner.run(lambda db: CartService(db).add_item_to_cart(current_user.id, item_in))
         logger.info("Added item ID %s to cart for user ID: %s", item_in.menu_item_id, current_user.id)
         return cart_response
     
@@ -28,28 +26,54 @@ def add_item_to_cart(item_in: AddToCartRequest,
         logger.warning("Failed to add item ID %s to cart for user ID: %s - %s", item_in.menu_item_id, current_user.id, str(e))
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/cart-items", response_model=CartResponse)
-def get_cart_items(db: Session = Depends(get_db),
-                   current_user: UserModel = Depends(get_current_user)) -> CartResponse:
-    service = CartService(db)
+@router.post("/add-item", response_model=CartResponse)
+async def add_item_to_cart(item_in: AddToCartRequest,
+                           response: Response,
+                           idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+                           runner: SessionRunner = Depends(get_session_runner),
+                           current_user: UserPrincipal = Depends(get_current_user)) -> CartResponse:
+    cart_response, replayed = await idempotency_store.run(
+        f"add-item:{current_user.id}", idempotency_key, request_fingerprint(item_in.model_dump()),
+        lambda: _add_item(runner, current_user, item_in),
+    )
+    if replayed:
+        response.headers[IDEMPOTENT_REPLAYED_HEADER] = "true"
+    return cart_response
+
+@router.post("/batch", response_model=CartResponse)
+async def apply_cart_batch(batch_in: CartBatchRequest,
+                           runner: SessionRunner = Depends(get_session_runner),
+                           current_user: UserPrincipal = Depends(get_current_user)) -> CartResponse:
+    try:
+        cart_response = await runner.run(lambda db: CartService(db).apply_batch(current_user.id, batch_in))
+        logger.info("Applied %s cart operations for user ID: %s", len(batch_in.operations), current_user.id)
+        return cart_response
 
+    except ValidationError as e:
+        logger.warning("Failed to apply cart batch for user ID: %s - %s", current_user.id, str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+    except ConflictError as e:
+        logger.warning("Conflict while applying cart batch for user ID: %s - %s", current_user.id, str(e))
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/cart-items", response_model=CartResponse)
+async def get_cart_items(runner: SessionRunner = Depends(get_session_runner),
+                         current_user: UserPrincipal = Depends(get_current_user)) -> Response:
     try:
-        items_response = service.get_cart(current_user.id)
+        content = await runner.run(lambda db: CartService(db).get_cart_bytes(current_user.id))
         logger.info("Retrieved cart items for user ID: %s", current_user.id)
-        return items_response
+        return json_response(content)
     
     except NotFoundError as e:
         logger.warning("Cart not found for user ID: %s - %s", current_user.id, str(e))
         raise HTTPException(status_code=404, detail=str(e))
     
 @router.patch("/update-item", response_model=CartResponse)
-def updater_cart_item(item_in: UpdateCartItemRequest,
-                      db: Session = Depends(get_db),
-                      current_user: UserModel = Depends(get_current_user)) -> CartResponse:
-    service = CartService(db)
-
+async def updater_cart_item(item_in: UpdateCartItemRequest,
+                            runner: SessionRunner = Depends(get_session_runner),
+                            current_user: UserPrincipal = Depends(get_current_user)) -> CartResponse:
     try:
-        item_response = service.update_cart_item_quantity(current_user.id, item_in)
+        item_response = await runner.run(lambda db: CartService(db).update_cart_item_quantity(current_user.id, item_in))
         logger.info("Updated cart item ID %s for user ID: %s", item_in.menu_item_id, current_user.id)
         return item_response
     
@@ -61,13 +85,11 @@ def updater_cart_item(item_in: UpdateCartItemRequest,
         raise HTTPException(status_code=409, detail=str(e))
     
 @router.delete("/remove-item", response_model=CartResponse)
-def delete_cart_item(menu_item_id: int,
-                     db: Session = Depends(get_db),
-                     current_user: UserModel = Depends(get_current_user)) -> CartResponse:
-    service = CartService(db)
-
+async def delete_cart_item(menu_item_id: int,
+                           runner: SessionRunner = Depends(get_session_runner),
+                           current_user: UserPrincipal = Depends(get_current_user)) -> CartResponse:
     try:
-        response = service.remove_cart_item(current_user.id, menu_item_id)
+        response = await runner.run(lambda db: CartService(db).remove_cart_item(current_user.id, menu_item_id))
         logger.info("Removed cart item ID %s for user ID: %s", menu_item_id, current_user.id)
         return response
     
@@ -75,16 +97,20 @@ def delete_cart_item(menu_item_id: int,
         logger.warning("Failed to remove cart item ID %s for user ID: %s - %s", menu_item_id, current_user.id, str(e))
         raise HTTPException(status_code=404, detail=str(e))
 
-@router.post("/place-order", response_model=PlaceOrderResponse)
-def place_order(db: Session = Depends(get_db),
-                current_user: UserModel = Depends(get_current_user)) -> PlaceOrderResponse:
-    service = CartService(db)
-
+async def _place_order(runner: SessionRunner, current_user: UserPrincipal) -> PlaceOrderResponse:
     try:
-        order_response = service.place_order(current_user.id)
+        order_response = await runner.run(lambda db: CartService(db).place_order(current_user.id))
         logger.info("Placed order for user ID: %s, order ID: %s", current_user.id, order_response.order_id)
         return order_response
     
+    except StockUnavailableError as e:
+        logger.warning("Stock unavailable while placing order for user ID: %s - %s", current_user.id,
+                       [line.menu_item_id for line in e.lines])
+        raise HTTPException(status_code=409, detail={
+            "message": str(e),
+            "unavailable_lines": [line.model_dump() for line in e.lines],
+        })
+
     except ConflictError as e:
         logger.warning("Failed to place order for user ID: %s - %s", current_user.id, str(e))
         raise HTTPException(status_code=409, detail=str(e))
@@ -92,15 +118,25 @@ def place_order(db: Session = Depends(get_db),
     except ValidationError as e:
         logger.warning("Validation error while placing order for user ID: %s - %s", current_user.id, str(e))
         raise HTTPException(status_code=400, detail=str(e))
-    
 
-@router.delete("/clear-cart", response_model=CartResponse)
-def clear_cart(db: Session = Depends(get_db),
-               current_user: UserModel = Depends(get_current_user)) -> CartResponse:
-    service = CartService(db)
+@router.post("/place-order", response_model=PlaceOrderResponse)
+async def place_order(response: Response,
+                      idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+                      runner: SessionRunner = Depends(get_session_runner),
+                      current_user: UserPrincipal = Depends(get_current_user)) -> PlaceOrderResponse:
+    order_response, replayed = await idempotency_store.run(
+        f"place-order:{current_user.id}", idempotency_key, request_fingerprint(),
+        lambda: _place_order(runner, current_user),
+    )
+    if replayed:
+        response.headers[IDEMPOTENT_REPLAYED_HEADER] = "true"
+    return order_response
 
+@router.delete("/clear-cart", response_model=CartResponse)
+async def clear_cart(runner: SessionRunner = Depends(get_session_runner),
+                     current_user: UserPrincipal = Depends(get_current_user)) -> CartResponse:
     try:
-        response = service.clear_cart(current_user.id)
+        response = await runner.run(lambda db: CartService(db).clear_cart(current_user.id))
         logger.info("Cleared cart for user ID: %s", current_user.id)
         return response
     
@@ -108,15 +144,20 @@ def clear_cart(db: Session = Depends(get_db),
         logger.warning("Failed to clear cart for user ID: %s - %s", current_user.id, str(e))
         raise HTTPException(status_code=404, detail=str(e))
     
-@router.get("/orders", response_model=list[OrderHistoryResponse])
-def get_order_history(db: Session = Depends(get_db),
-                      current_user: UserModel = Depends(get_current_user)) -> list[OrderHistoryResponse]:
-    service = CartService(db)
+@router.get("/orders", response_model=OrderHistoryPage)
+async def get_order_history(limit: int = Query(ORDER_HISTORY_PAGE_SIZE, ge=1, le=ORDER_HISTORY_MAX_PAGE_SIZE),
+                            cursor: str | None = None,
+                            summary: bool = False,
+                            runner: SessionRunner = Depends(get_user_read_session_runner),
+                            current_user: UserPrincipal = Depends(get_current_user)) -> OrderHistoryPage:
+    try:
+        order_history = await runner.run(lambda db: CartService(db).get_order_history(current_user.id, limit, cursor, summary))
+        logger.info("Retrieved order history for user ID: %s, page size: %s", current_user.id, len(order_history.orders))
+        return order_history
 
-    order_history = service.get_order_history(current_user.id)
-    logger.info("Retrieved order history for user ID: %s, total orders: %s", current_user.id, len(order_history))
-    
-    return order_history
+    except ValidationError as e:
+        logger.warning("Failed to retrieve order history for user ID: %s - %s", current_user.id, str(e))
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 
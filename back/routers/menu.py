@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from back.db.session import get_db
-from back.models.menu import CategoryCreate, CategoryOut, MenuItemCreate, MenuItemOut, MenuItemUpdate
+from back.db.async_session import SessionRunner
+from back.db.replica import pinned_read_session_runner
+from back.models.menu import CategoryCreate, CategoryOut, MenuItemCreate, MenuItemOut, MenuItemUpdate, MenuSnapshot, MenuSearchPage
 from back.core.dependencies import get_current_user
 from back.services.domain_errors import NotFoundError, ConflictError, ValidationError
 from back.services.menu import MenuService
+from back.services.menu_cache import menu_cache
+from back.core.json_bytes import dumps, json_response
+from back.core.config import MENU_HTTP_MAX_AGE_SECONDS, MENU_HTTP_STALE_WHILE_REVALIDATE_SECONDS
+from back.core.config import MENU_SEARCH_PAGE_SIZE, MENU_SEARCH_MAX_PAGE_SIZE
 import logging
 from pathlib import Path
 import uuid
@@ -16,6 +22,8 @@ MAX_SIZE = 8 * 1024 * 1024
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/menu", tags=["menu"])
 
+get_menu_read_session_runner = pinned_read_session_runner(menu_cache.needs_primary)
+
 @router.post("/create_category", response_model=CategoryOut)
 def create_menu_category(category_in: CategoryCreate, 
                          db: Session = Depends(get_db), 
@@ -67,17 +75,83 @@ def delete_category(category_id: int,
     logger.info("Category deleted with ID: %s by user ID: %s", category_id, current_user.id)
     return category
 
+def _variant_etag(etag: str, variant: str) -> str:
+    return f'"{etag}-{variant}"'
+
+def _cache_headers(etag: str) -> dict:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={MENU_HTTP_MAX_AGE_SECONDS}, "
+                         f"stale-while-revalidate={MENU_HTTP_STALE_WHILE_REVALIDATE_SECONDS}",
+    }
+
+def _etag_matches(request: Request, etag: str, wildcard: bool = True) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return (wildcard and "*" in candidates) or etag in candidates
+
+# Menu reads answer from the cache when they can: a matching If-None-Match gets a 304
+# and an unchanged representation is sent as its cached JSON bytes, both without
+# touching the database, the models or the encoder.
+async def _cached_menu_read(request: Request, variant: str, read) -> Response:
+    # "*" only matches a representation that exists, which this shortcut cannot know
+    # for a category that may be missing; it is honoured once the variant is read.
+    cached_etag = menu_cache.current_etag()
+    if cached_etag and _etag_matches(request, _variant_etag(cached_etag, variant), wildcard=False):
+        return Response(status_code=304, headers=_cache_headers(_variant_etag(cached_etag, variant)))
+
+    cached = menu_cache.current_encoded(variant)
+    if cached is None:
+        result, raw_etag = await read()
+        content = menu_cache.encoded(variant, raw_etag, lambda: dumps(result))
+    else:
+        raw_etag, content = cached
+
+    etag = _variant_etag(raw_etag, variant)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=_cache_headers(etag))
+
+    return json_response(content, headers=_cache_headers(etag))
+
+def _read_with_etag(read):
+    def run(db):
+        service = MenuService(db)
+        return read(service), service.menu_etag
+    return run
+
+@router.get("/snapshot", response_model=MenuSnapshot)
+async def get_menu_snapshot(request: Request,
+                            runner: SessionRunner = Depends(get_menu_read_session_runner)):
+
+    return await _cached_menu_read(request, "snapshot", lambda: runner.run(
+        _read_with_etag(lambda service: service.get_menu_snapshot())))
+
 @router.get("/get_all_categories", response_model=list[CategoryOut])
-def get_all_categories(db: Session = Depends(get_db)):
-    
-    menu_service = MenuService(db)
-    categories = menu_service.get_all_categories()
-    if not categories:
-        logger.warning("No categories found")
-        raise HTTPException(status_code=404, detail="No categories found")
-    
-    logger.info("All categories retrieved")
-    return categories
+async def get_all_categories(request: Request,
+                             runner: SessionRunner = Depends(get_menu_read_session_runner)):
+
+    async def read():
+        categories, etag = await runner.run(_read_with_etag(lambda service: service.get_all_categories()))
+        if not categories:
+            logger.warning("No categories found")
+            raise HTTPException(status_code=404, detail="No categories found")
+        
+        logger.info("All categories retrieved")
+        return categories, etag
+
+    return await _cached_menu_read(request, "categories", read)
+
+@router.get("/search", response_model=MenuSearchPage)
+async def search_menu(q: str = Query(..., min_length=1, max_length=100),
+                      limit: int = Query(MENU_SEARCH_PAGE_SIZE, ge=1, le=MENU_SEARCH_MAX_PAGE_SIZE),
+                      offset: int = Query(0, ge=0),
+                      runner: SessionRunner = Depends(get_menu_read_session_runner)) -> MenuSearchPage:
+
+    page = await runner.run(lambda db: MenuService(db).search_items(q, limit, offset))
+    logger.info("Menu search returned %s items", len(page.items))
+    return page
 
 @router.post("/create_item", response_model=MenuItemOut)
 def create_menu_item(name: str = Form(...),
@@ -189,11 +263,18 @@ def upload_item_image(item_id: int,
     return item
 
 @router.get("/get_items_by_category/{category_id}", response_model=list[MenuItemOut])
-def get_items_by_category(category_id: int,
-                          db: Session = Depends(get_db)):  
-      
-    menu_service = MenuService(db)
-    return menu_service.get_items_by_category(category_id)
+async def get_items_by_category(category_id: int, request: Request,
+                                runner: SessionRunner = Depends(get_menu_read_session_runner)):  
+
+    async def read():
+        try:
+            return await runner.run(_read_with_etag(lambda service: service.get_items_by_category(category_id)))
+
+        except NotFoundError as e:
+            logger.warning("Items requested for unknown category ID: %s", category_id)
+            raise HTTPException(status_code=404, detail=str(e))
+
+    return await _cached_menu_read(request, f"category-{category_id}", read)
 
 @router.patch("/update_item/{item_id}", response_model=MenuItemOut)
 def update_menu_item(item_id: int,
@@ -0,0 +1,17 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
+from back.core import metrics
+from back.core.dependencies import get_current_user
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+def get_metrics(current_user = Depends(get_current_user)) -> dict:
+    # Pool, cache and per-route figures describe the deployment; admins only.
+    if current_user.role not in ["admin", "super_admin"]:
+        logger.warning("Unauthorized attempt to read metrics by user ID: %s", current_user.id)
+        raise HTTPException(status_code=403, detail="Only admins can view metrics")
+
+    return metrics.snapshot()
@@ -11,13 +11,15 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/users", tags=["users"])
 
 @router.get("/me", response_model=User_Out)
-def get_current_user_info(current_user = Depends(get_current_user)):
+def get_current_user_info(db: Session = Depends(get_db),
+                          current_user = Depends(get_current_user)):
+    user = UserService(db).get_user(current_user.id)
     return {
-        "id": current_user.id, 
-        "username": current_user.username, 
-        "email": current_user.email,
-        "phone_number": current_user.phone_number, 
-        "role": current_user.role}
+        "id": user.id, 
+        "username": user.username, 
+        "email": user.email,
+        "phone_number": user.phone_number, 
+        "role": user.role}
 
 @router.patch("/me", response_model=UserUpdate)
 def update_user_profile(user_in: UserUpdate,
@@ -44,17 +46,17 @@ def update_user_profile(user_in: UserUpdate,
         raise HTTPException(status_code=e.status_code, detail=e.detail)
     
 @router.patch("/me/change_password")
-def change_password(password_in: ChangePasswordRequest,
-                    db:Session = Depends(get_db),
-                    current_user = Depends(get_current_user)):
+async def change_password(password_in: ChangePasswordRequest,
+                          db:Session = Depends(get_db),
+                          current_user = Depends(get_current_user)):
     service = UserService(db)
     try:
-        service.update_user_password(current_user, password_in.current_password, password_in.new_password)
+        await service.update_user_password_async(current_user.id, password_in.current_password, password_in.new_password)
         logger.info("User ID %s changed their password", current_user.id)
         return {"message": "Password updated successfully"}
     
     except HTTPException as e:
         if e.status_code == 400:
             logger.warning("User ID %s provided incorrect current password", current_user.id)
-        raise HTTPException(status_code=e.status_code, detail=e.detail)
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers=e.headers)
     
@@ -1,79 +1,105 @@
+import base64
+import json
+from datetime import datetime
+
 from sqlalchemy.orm import Session
-from back.models.orders import AddToCartRequest, CartItemResponse, UpdateCartItemRequest, CartResponse, PlaceOrderResponse, OrderHistoryResponse
+from back.models.orders import AddToCartRequest, CartBatchRequest, UpdateCartItemRequest, CartResponse, PlaceOrderResponse, OrderHistoryPage
 import back.crud.cart as cart_crud
 from back.services.domain_errors import NotFoundError, ValidationError, ConflictError
+from back.db.read_routing import mark_write
+from back.services.cart_store import CartStore, cart_store
+
+def _encode_cursor(created_at: str, order_id: int) -> str:
+    raw = json.dumps([created_at, order_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, order_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(order_id)
+
+    except (ValueError, TypeError):
+        raise ValidationError("Invalid cursor")
 
 class CartService: 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, store: CartStore | None = None):
         self.db = db
-
-    def _build_cart_response(self, cart) -> CartResponse:
-        return CartResponse(
-            status=cart.status,
-            items=[
-                CartItemResponse(
-                    id=item.id,
-                    menu_item_id=item.menu_item_id,
-                    name=item.menu_item.name,
-                    quantity=item.quantity,
-                    unit_price_cents=item.price_cents_snapshot,
-                    line_total_cents=item.quantity * item.price_cents_snapshot
-                ) for item in cart.items
-            ],
-            total_price_cents=cart.total_price_cents
-        )
+        self.store = store or cart_store
 
     def create_cart(self, user_id: int) -> CartResponse:
-        cart = cart_crud.create_cart(self.db, user_id)
-        return self._build_cart_response(cart)
+        return self.store.create_cart(self.db, user_id)
     
     def add_item_to_cart(self, user_id: int, item_in: AddToCartRequest) -> CartResponse:
-        cart_response = cart_crud.add_item_to_cart(self.db, user_id, item_in)
+        cart_response = self.store.add_item(self.db, user_id, item_in)
 
         if not cart_response:
             raise ValidationError("Invalid menu item or quantity")
         
+        mark_write(f"user:{user_id}")
         return cart_response
     
+    def apply_batch(self, user_id: int, batch_in: CartBatchRequest) -> CartResponse:
+        cart_response = self.store.apply_operations(self.db, user_id, batch_in.operations)
+
+        mark_write(f"user:{user_id}")
+        return cart_response
+
     def list_cart_items(self, user_id: int) -> CartResponse:
-        cart = cart_crud.get_cart_by_user(self.db, user_id)
-        return cart
+        return self.store.get_cart(self.db, user_id)
     
     def get_cart(self, user_id: int) -> CartResponse:
-        return cart_crud.get_cart_by_user(self.db, user_id)
+        return self.store.get_cart(self.db, user_id)
+
+    def get_cart_bytes(self, user_id: int) -> bytes:
+        return self.store.get_cart_bytes(self.db, user_id)
 
     def update_cart_item_quantity(self, user_id: int, item_in: UpdateCartItemRequest) -> CartResponse:
-        cart_response = cart_crud.update_cart_item_quantity(self.db, user_id, item_in)
+        cart_response = self.store.update_item(self.db, user_id, item_in)
 
         if not cart_response:
             raise ValidationError("Invalid menu item or quantity")
         
+        mark_write(f"user:{user_id}")
         return cart_response
     
     def remove_cart_item(self, user_id: int, menu_item_id: int) -> CartResponse:
-        cart_response = cart_crud.remove_item_from_cart(self.db, user_id, menu_item_id)
+        cart_response = self.store.remove_item(self.db, user_id, menu_item_id)
         
         if not cart_response:
             raise NotFoundError("Failed to remove item from cart")
         
+        mark_write(f"user:{user_id}")
         return cart_response
     
     def place_order(self, user_id: int) -> PlaceOrderResponse:
-        order_response = cart_crud.place_order(self.db, user_id)
+        order_response = self.store.place_order(self.db, user_id)
 
         if not order_response:
             raise ConflictError("Failed to place order. Please check your cart and try again")
         
+        mark_write(f"user:{user_id}")
         return order_response
     
     def clear_cart(self, user_id: int) -> CartResponse:
-        cart_response = cart_crud.clear_cart(self.db, user_id)
+        cart_response = self.store.clear(self.db, user_id)
 
         if not cart_response:
             raise NotFoundError("Cart not found")
         
+        mark_write(f"user:{user_id}")
         return cart_response
     
-    def get_order_history(self, user_id: int) -> list[OrderHistoryResponse]:
-        return cart_crud.get_orders_by_user(self.db, user_id)
+    def get_order_history(self, user_id: int, limit: int, cursor: str | None = None,
+                          summary: bool = False) -> OrderHistoryPage:
+        after = _decode_cursor(cursor) if cursor else None
+        # One extra row tells us whether another page exists without a COUNT.
+        orders = cart_crud.get_orders_by_user(self.db, user_id, limit + 1, after, include_items=not summary)
+
+        next_cursor = None
+        if len(orders) > limit:
+            orders = orders[:limit]
+            next_cursor = _encode_cursor(orders[-1].created_at, orders[-1].order_id)
+
+        return OrderHistoryPage(orders=orders, next_cursor=next_cursor)
     
\ No newline at end of file
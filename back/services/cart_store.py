@@ -0,0 +1,417 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import back.crud.cart as cart_crud
+import back.crud.menu as menu_crud
+from back.core import metrics
+from back.core.cache import TTLCache
+from back.core.json_bytes import dumps
+from back.core.config import CART_RESPONSE_CACHE_MAX_SIZE, CART_STORE_BACKEND, CART_TTL_SECONDS, CART_SNAPSHOT_PATH, CART_SNAPSHOT_INTERVAL_SECONDS
+from back.models.orders import AddToCartRequest, CartItemResponse, CartOperation, CartResponse
+from back.models.orders import PlaceOrderResponse, UpdateCartItemRequest
+from back.services.domain_errors import ValidationError
+from back.services.menu_cache import menu_cache
+
+logger = logging.getLogger(__name__)
+
+CART_RESPONSE_CACHE_TTL_SECONDS = 300
+_EMPTY_CART = {"status": "cart", "items": [], "total_price_cents": 0}
+
+# Every method returns None where the cart or line it needs does not exist; CartService
+# turns that into the matching domain error.
+class CartStore(Protocol):
+    def create_cart(self, db: Session, user_id: int) -> CartResponse:
+        ...
+
+    def get_cart(self, db: Session, user_id: int) -> CartResponse:
+        ...
+
+    def get_cart_bytes(self, db: Session, user_id: int) -> bytes:
+        ...
+
+    def add_item(self, db: Session, user_id: int, item_in: AddToCartRequest) -> CartResponse | None:
+        ...
+
+    def update_item(self, db: Session, user_id: int, item_in: UpdateCartItemRequest) -> CartResponse | None:
+        ...
+
+    def remove_item(self, db: Session, user_id: int, menu_item_id: int) -> CartResponse | None:
+        ...
+
+    def apply_operations(self, db: Session, user_id: int, operations: list[CartOperation]) -> CartResponse:
+        ...
+
+    def clear(self, db: Session, user_id: int) -> CartResponse | None:
+        ...
+
+    def place_order(self, db: Session, user_id: int) -> PlaceOrderResponse | None:
+        ...
+
+class SQLCartStore:
+    # Carts are rows in orders with status "cart"; every edit is a database write.
+    def __init__(self, response_cache_size: int = CART_RESPONSE_CACHE_MAX_SIZE):
+        # Encoded cart per user, reused while the cart row and the menu are unchanged:
+        # every cart write moves updated_at through the total update, and the lines
+        # carry menu item names and images.
+        self._encoded = TTLCache(max_size=response_cache_size, ttl=CART_RESPONSE_CACHE_TTL_SECONDS)
+
+    def create_cart(self, db: Session, user_id: int) -> CartResponse:
+        cart = cart_crud.get_or_create_cart(db, user_id)
+        return CartResponse(status=cart.status, items=cart_crud.load_cart_items(db, cart.id),
+                            total_price_cents=cart.total_price_cents)
+
+    def get_cart(self, db: Session, user_id: int) -> CartResponse:
+        return cart_crud.get_cart_by_user(db, user_id)
+
+    def get_cart_bytes(self, db: Session, user_id: int) -> bytes:
+        cart = cart_crud.get_cart(db, user_id)
+        if not cart:
+            return dumps(_EMPTY_CART)
+
+        key = (cart.id, cart.updated_at, cart.total_price_cents, menu_cache.version)
+        cached = self._encoded.get(user_id)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        content = dumps({
+            "status": cart.status,
+            "items": cart_crud.load_cart_item_rows(db, cart.id),
+            "total_price_cents": cart.total_price_cents,
+        })
+        self._encoded.set(user_id, (key, content))
+        return content
+
+    def stats(self) -> dict:
+        return self._encoded.stats()
+
+    def reset(self) -> None:
+        self._encoded.clear()
+
+    def add_item(self, db: Session, user_id: int, item_in: AddToCartRequest) -> CartResponse | None:
+        return cart_crud.add_item_to_cart(db, user_id, item_in)
+
+    def update_item(self, db: Session, user_id: int, item_in: UpdateCartItemRequest) -> CartResponse | None:
+        return cart_crud.update_cart_item_quantity(db, user_id, item_in)
+
+    def remove_item(self, db: Session, user_id: int, menu_item_id: int) -> CartResponse | None:
+        return cart_crud.remove_item_from_cart(db, user_id, menu_item_id)
+
+    def apply_operations(self, db: Session, user_id: int, operations: list[CartOperation]) -> CartResponse:
+        return cart_crud.apply_cart_operations(db, user_id, operations)
+
+    def clear(self, db: Session, user_id: int) -> CartResponse | None:
+        return cart_crud.clear_cart(db, user_id)
+
+    def place_order(self, db: Session, user_id: int) -> PlaceOrderResponse | None:
+        return cart_crud.place_order(db, user_id)
+
+    def close(self) -> None:
+        pass
+
+@dataclass
+class _Line:
+    menu_item_id: int
+    quantity: int
+    price_cents_snapshot: int
+    name: str
+    image_url: str | None = None
+
+@dataclass
+class _MemoryCart:
+    expires_at: float
+    lines: dict[int, _Line] = field(default_factory=dict)
+
+class MemoryCartStore:
+    # Carts live in process memory and reach orders/order_items only at checkout. A
+    # background thread snapshots them to a local file so a restart does not lose them.
+    def __init__(self, ttl_seconds: int, snapshot_path: str | None = None, snapshot_interval: float = 5.0):
+        self.ttl_seconds = ttl_seconds
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._carts: dict[int, _MemoryCart] = {}
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._stop = threading.Event()
+        self._writer: threading.Thread | None = None
+
+        if snapshot_path:
+            self._load_snapshot()
+
+    def _get(self, user_id: int, create: bool = False) -> _MemoryCart | None:
+        # Wall clock, not monotonic: expiry times survive a restart through the snapshot.
+        now = time.time()
+        cart = self._carts.get(user_id)
+
+        if cart is not None and cart.expires_at <= now:
+            del self._carts[user_id]
+            cart = None
+
+        if cart is None and create:
+            cart = self._carts[user_id] = _MemoryCart(expires_at=0)
+
+        if cart is not None:
+            cart.expires_at = now + self.ttl_seconds
+        return cart
+
+    def _response(self, cart: _MemoryCart | None) -> CartResponse:
+        lines = cart.lines.values() if cart else []
+        items = [
+            CartItemResponse(
+                id=line.menu_item_id,
+                menu_item_id=line.menu_item_id,
+                name=line.name,
+                quantity=line.quantity,
+                unit_price_cents=line.price_cents_snapshot,
+                line_total_cents=line.quantity * line.price_cents_snapshot,
+                image_url=line.image_url,
+            ) for line in lines
+        ]
+        return CartResponse(status="cart", items=items, total_price_cents=sum(item.line_total_cents for item in items))
+
+    def _changed(self) -> None:
+        self._dirty = True
+        metrics.increment("memory_cart_writes")
+        self._ensure_writer()
+
+    def _new_line(self, db: Session, menu_item_id: int) -> _Line | None:
+        menu_item = menu_crud.get_item_by_id(db, menu_item_id)
+        if menu_item is None:
+            return None
+        return _Line(menu_item.id, 0, menu_item.price_cents, menu_item.name, menu_item.image_url)
+
+    def create_cart(self, db: Session, user_id: int) -> CartResponse:
+        with self._lock:
+            return self._response(self._get(user_id, create=True))
+
+    def get_cart(self, db: Session, user_id: int) -> CartResponse:
+        with self._lock:
+            return self._response(self._get(user_id))
+
+    def get_cart_bytes(self, db: Session, user_id: int) -> bytes:
+        return dumps(self.get_cart(db, user_id))
+
+    def add_item(self, db: Session, user_id: int, item_in: AddToCartRequest) -> CartResponse | None:
+        if item_in.quantity <= 0:
+            return None
+
+        with self._lock:
+            cart = self._get(user_id)
+            known = cart is not None and item_in.menu_item_id in cart.lines
+
+        # The menu lookup runs outside the lock.
+        new_line = None if known else self._new_line(db, item_in.menu_item_id)
+        if not known and new_line is None:
+            return None
+
+        with self._lock:
+            cart = self._get(user_id, create=True)
+            line = cart.lines.get(item_in.menu_item_id) or new_line
+            if line is None:
+                return None
+
+            cart.lines[item_in.menu_item_id] = line
+            line.quantity += item_in.quantity
+            self._changed()
+            return self._response(cart)
+
+    def update_item(self, db: Session, user_id: int, item_in: UpdateCartItemRequest) -> CartResponse | None:
+        if item_in.quantity < 0:
+            return None
+
+        with self._lock:
+            cart = self._get(user_id)
+            if cart is None or item_in.menu_item_id not in cart.lines:
+                return None
+
+            if item_in.quantity == 0:
+                del cart.lines[item_in.menu_item_id]
+            else:
+                cart.lines[item_in.menu_item_id].quantity = item_in.quantity
+
+            self._changed()
+            return self._response(cart)
+
+    def remove_item(self, db: Session, user_id: int, menu_item_id: int) -> CartResponse | None:
+        with self._lock:
+            cart = self._get(user_id)
+            if cart is None or cart.lines.pop(menu_item_id, None) is None:
+                return None
+
+            self._changed()
+            return self._response(cart)
+
+    def apply_operations(self, db: Session, user_id: int, operations: list[CartOperation]) -> CartResponse:
+        with self._lock:
+            cart = self._get(user_id)
+            existing = set(cart.lines) if cart else set()
+
+        added = {}
+        for menu_item_id in {op.menu_item_id for op in operations if op.op == "add"} - existing:
+            line = self._new_line(db, menu_item_id)
+            if line is not None:
+                added[menu_item_id] = line
+
+        with self._lock:
+            cart = self._get(user_id, create=True)
+            # Work on a copy so a rejected batch leaves the cart untouched.
+            lines = {menu_item_id: _Line(**vars(line)) for menu_item_id, line in cart.lines.items()}
+
+            for index, op in enumerate(operations):
+                line = lines.get(op.menu_item_id)
+
+                if op.op == "add":
+                    if line is None:
+                        line = added.get(op.menu_item_id)
+                    if op.quantity <= 0 or line is None:
+                        raise ValidationError(f"Operation {index}: invalid menu item or quantity")
+
+                    lines[op.menu_item_id] = line
+                    line.quantity += op.quantity
+                    continue
+
+                if line is None:
+                    raise ValidationError(f"Operation {index}: item is not in the cart")
+
+                if op.op == "remove" or op.quantity == 0:
+                    del lines[op.menu_item_id]
+                elif op.quantity < 0:
+                    raise ValidationError(f"Operation {index}: invalid quantity")
+                else:
+                    line.quantity = op.quantity
+
+            cart.lines = lines
+            self._changed()
+            return self._response(cart)
+
+    def clear(self, db: Session, user_id: int) -> CartResponse | None:
+        with self._lock:
+            cart = self._get(user_id)
+            if cart is None:
+                return None
+
+            cart.lines.clear()
+            self._changed()
+            return self._response(cart)
+
+    def place_order(self, db: Session, user_id: int) -> PlaceOrderResponse | None:
+        with self._lock:
+            cart = self._get(user_id)
+            if cart is None or not cart.lines:
+                return None
+            lines = [(line.menu_item_id, line.quantity, line.price_cents_snapshot) for line in cart.lines.values()]
+
+        order_response = cart_crud.place_order_from_lines(db, user_id, lines)
+
+        # Only the ordered quantities leave the cart, once the order is durable: lines
+        # added while the checkout ran stay, and a rolled-back checkout keeps everything.
+        def discard(session: Session) -> None:
+            event.remove(db, "after_rollback", keep)
+            with self._lock:
+                if self._carts.get(user_id) is not cart:
+                    return
+
+                for menu_item_id, quantity, _ in lines:
+                    line = cart.lines.get(menu_item_id)
+                    if line is not None:
+                        line.quantity -= quantity
+                        if line.quantity <= 0:
+                            del cart.lines[menu_item_id]
+
+                if not cart.lines:
+                    del self._carts[user_id]
+                self._changed()
+
+        def keep(session: Session) -> None:
+            event.remove(db, "after_commit", discard)
+
+        event.listen(db, "after_commit", discard, once=True)
+        event.listen(db, "after_rollback", keep, once=True)
+        return order_response
+
+    def _ensure_writer(self) -> None:
+        if not self.snapshot_path or self._writer is not None:
+            return
+
+        self._writer = threading.Thread(target=self._write_loop, name="cart-snapshot", daemon=True)
+        self._writer.start()
+
+    def _write_loop(self) -> None:
+        while not self._stop.wait(self.snapshot_interval):
+            try:
+                self.snapshot()
+            except OSError:
+                logger.exception("Failed to write cart snapshot to %s", self.snapshot_path)
+
+    def snapshot(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+
+            now = time.time()
+            data = {
+                str(user_id): {"expires_at": cart.expires_at, "lines": [vars(line) for line in cart.lines.values()]}
+                for user_id, cart in self._carts.items() if cart.expires_at > now
+            }
+            self._dirty = False
+
+        # Write-then-rename: a crash mid-write leaves the previous snapshot intact.
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _load_snapshot(self) -> None:
+        try:
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+
+        except FileNotFoundError:
+            return
+
+        except (OSError, ValueError):
+            logger.exception("Ignoring unreadable cart snapshot %s", self.snapshot_path)
+            return
+
+        now = time.time()
+        for user_id, cart in data.items():
+            if cart["expires_at"] > now:
+                lines = {line["menu_item_id"]: _Line(**line) for line in cart["lines"]}
+                self._carts[int(user_id)] = _MemoryCart(expires_at=cart["expires_at"], lines=lines)
+
+        logger.info("Restored %s carts from %s", len(self._carts), self.snapshot_path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"carts": len(self._carts)}
+
+    def close(self) -> None:
+        self._stop.set()
+        if self.snapshot_path:
+            self.snapshot()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._carts.clear()
+            self._dirty = True
+
+def _build_store() -> CartStore:
+    if CART_STORE_BACKEND == "memory":
+        store = MemoryCartStore(CART_TTL_SECONDS, CART_SNAPSHOT_PATH or None, CART_SNAPSHOT_INTERVAL_SECONDS)
+        metrics.register_collector("memory_cart_store", store.stats)
+        return store
+
+    store = SQLCartStore()
+    metrics.register_collector("cart_response_cache", store.stats)
+    return store
+
+cart_store = _build_store()
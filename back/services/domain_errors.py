@@ -8,4 +8,9 @@ class ConflictError(DomainError):
     pass
 
 class ValidationError(DomainError):
-    pass
\ No newline at end of file
+    pass
+
+class StockUnavailableError(ConflictError):
+    def __init__(self, message: str, lines: list):
+        super().__init__(message)
+        self.lines = lines
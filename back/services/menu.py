@@ -1,12 +1,26 @@
+import logging
+
 import back.crud.menu as menu_crud
-from back.models.menu import CategoryCreate, CategoryUpdate, MenuItemCreate, MenuItemUpdate, CategoryOut, MenuItemOut
+from back.models.menu import CategoryCreate, CategoryUpdate, MenuItemCreate, MenuItemUpdate, CategoryOut, MenuItemOut, MenuSnapshot
+from back.models.menu import MenuSearchPage
 
 from sqlalchemy.orm import Session
 
 from back.services.domain_errors import NotFoundError, ConflictError, ValidationError
+from back.db.read_routing import is_replica_session, mark_write
+from back.db.session import SessionLocal, get_engine
+from back.services.menu_cache import menu_cache
+from back.services.menu_search import MenuSearchIndex, menu_search_index
+
+logger = logging.getLogger(__name__)
+
+_ITEM_FIELDS = tuple(MenuItemOut.model_fields)
+
 class MenuService:
     def __init__(self, db: Session):
         self.db = db
+        # ETag of the snapshot the last read was answered from.
+        self.menu_etag: str | None = None
 
     def create_category(self, name: str) -> CategoryOut:
         category_in = CategoryCreate(name=name)
@@ -14,31 +28,61 @@ class MenuService:
 
         if not category:
             raise ConflictError("Category already exists")
+        self._menu_changed()
         return CategoryOut.model_validate(category)
     
-    def get_category_by_id(self, category_id: int) -> CategoryOut:
-        category = menu_crud.get_category_by_id(self.db, category_id)
+    def _menu_changed(self) -> None:
+        mark_write("menu")
+        menu_cache.bump()
+
+    def _build_menu_snapshot(self) -> MenuSnapshot:
+        categories = menu_crud.get_menu_snapshot(self.db)
+        # Rows come straight from our own tables, so the models are built without
+        # re-validating every field.
+        return MenuSnapshot.model_construct(categories=[
+            CategoryOut.model_construct(
+                id=category.id,
+                name=category.name,
+                items=[
+                    MenuItemOut.model_construct(**{field: getattr(item, field) for field in _ITEM_FIELDS})
+                    for item in category.items
+                ],
+            ) for category in categories
+        ])
+
+    def _cached_snapshot(self) -> tuple[MenuSnapshot, str]:
+        return menu_cache.get_with_etag(self._build_menu_snapshot, from_replica=is_replica_session(self.db))
+
+    # Every category listing is served from the cached snapshot: one query per menu version.
+    def get_menu_snapshot(self) -> MenuSnapshot:
+        snapshot, self.menu_etag = self._cached_snapshot()
+        return snapshot
+
+    def _categories(self) -> tuple[dict[int, CategoryOut], dict[str, CategoryOut]]:
+        snapshot, self.menu_etag = self._cached_snapshot()
+        return menu_cache.categories(snapshot, self.menu_etag)
 
-        if not category:
+    def get_category_by_id(self, category_id: int) -> CategoryOut:
+        category = self._categories()[0].get(category_id)
+        if category is None:
             raise NotFoundError("Category not found")
-        return CategoryOut.model_validate(category)
+        return category
     
     def get_category_by_name(self, name: str) -> CategoryOut:
-        category = menu_crud.get_category_by_name(self.db, name)
-
-        if not category:
+        category = self._categories()[1].get(name)
+        if category is None:
             raise NotFoundError("Category not found")
-        return CategoryOut.model_validate(category)
+        return category
     
     def get_all_categories(self) -> list[CategoryOut]:
-        categories = menu_crud.get_all_categories(self.db)
-        return [CategoryOut.model_validate(category) for category in categories]
+        return self.get_menu_snapshot().categories
     
     def delete_category(self, category_id: int) -> CategoryOut:
         category = menu_crud.delete_category(self.db, category_id)
 
         if not category:
             raise NotFoundError("Category not found")
+        self._menu_changed()
         return CategoryOut.model_validate(category)
 
     def update_category(self, category_id: int, name: str) -> CategoryOut:
@@ -52,14 +96,11 @@ class MenuService:
 
         if not category:
             raise NotFoundError("Category not found")
+        self._menu_changed()
         return CategoryOut.model_validate(category)
 
     def get_category_with_items(self, category_id: int) -> CategoryOut:
-        category = menu_crud.get_category_with_items(self.db, category_id)
-
-        if not category:
-            raise NotFoundError("Category not found")
-        return CategoryOut.model_validate(category)
+        return self.get_category_by_id(category_id)
     
     def create_item(self, 
                     name: str, 
@@ -86,8 +127,30 @@ class MenuService:
             image_url=image_url
         )
         item = menu_crud.create_item(self.db, item_in)
+        self._menu_changed()
         return MenuItemOut.model_validate(item)
     
+    def search_items(self, query: str, limit: int, offset: int = 0) -> MenuSearchPage:
+        # One extra row tells us whether another page exists without a COUNT.
+        if self.db.get_bind().dialect.name == "postgresql":
+            items = [MenuItemOut.model_validate(item)
+                     for item in menu_crud.search_items(self.db, query, limit + 1, offset)]
+        else:
+            items = self._search_index().search(query, offset + limit + 1)[offset:]
+
+        next_offset = offset + limit if len(items) > limit else None
+        return MenuSearchPage(items=items[:limit], next_offset=next_offset)
+
+    def _search_index(self) -> MenuSearchIndex:
+        # Without trigram or full-text indexes, search an in-memory index built from
+        # the cached snapshot; menu writes invalidate both.
+        snapshot, etag = self._cached_snapshot()
+        return menu_search_index.get(etag, lambda: MenuSearchIndex.from_snapshot(snapshot))
+
+    def warm_up_search_index(self) -> None:
+        if self.db.get_bind().dialect.name != "postgresql":
+            self._search_index()
+
     def get_item_by_id(self, item_id: int) -> MenuItemOut:
         item = menu_crud.get_item_by_id(self.db, item_id)
 
@@ -100,11 +163,7 @@ class MenuService:
         return [MenuItemOut.model_validate(item) for item in items]
     
     def get_items_by_category(self, category_id: int) -> list[MenuItemOut]:
-        items = menu_crud.get_items_by_category(self.db, category_id)
-
-        if items is None:
-            raise NotFoundError("Category not found")
-        return [MenuItemOut.model_validate(item) for item in items]
+        return self.get_category_by_id(category_id).items
     
     def update_item(self, 
                     item_id: int, 
@@ -135,6 +194,7 @@ class MenuService:
         item = menu_crud.update_item(self.db, item_id, item_in)
         if not item:
             raise NotFoundError("Item not found")
+        self._menu_changed()
         return MenuItemOut.model_validate(item)
     
     def delete_item(self, item_id: int) -> MenuItemOut:
@@ -142,6 +202,7 @@ class MenuService:
 
         if not item:
             raise NotFoundError("Item not found")
+        self._menu_changed()
         return MenuItemOut.model_validate(item)
     
     def set_item_availability(self, item_id: int, is_available: bool) -> MenuItemOut:
@@ -149,6 +210,7 @@ class MenuService:
 
         if not item:
             raise NotFoundError("Item not found")
+        self._menu_changed()
         return MenuItemOut.model_validate(item)
     
     def update_item_stock(self, item_id: int, stock: int) -> MenuItemOut:
@@ -156,6 +218,7 @@ class MenuService:
 
         if not item:
             raise NotFoundError("Item not found")
+        self._menu_changed()
         return MenuItemOut.model_validate(item)
     
     def get_available_items(self) -> list[MenuItemOut]:
@@ -166,4 +229,13 @@ class MenuService:
         items = menu_crud.get_unavailable_items(self.db)
         return [MenuItemOut.model_validate(item) for item in items]
 
-   
\ No newline at end of file
+def warm_up_search_index() -> None:
+    # Builds the first in-memory search index at startup rather than in the first search;
+    # if that fails (say, before the tables exist) the first search builds it instead.
+    try:
+        get_engine()
+        with SessionLocal() as db:
+            MenuService(db).warm_up_search_index()
+
+    except Exception:
+        logger.exception("Failed to warm up the menu search index")
@@ -0,0 +1,188 @@
+import hashlib
+import threading
+import time
+from typing import Callable
+
+from back.core import metrics
+from back.core.config import MENU_CACHE_MAX_AGE_SECONDS
+from back.core.json_bytes import dumps
+from back.models.menu import CategoryOut, MenuSnapshot
+
+# A hash of the content rather than the version: versions restart with each process,
+# so they cannot tell two workers' menus apart.
+def content_etag(snapshot: MenuSnapshot) -> str:
+    return hashlib.sha256(dumps(snapshot)).hexdigest()[:32]
+
+class MenuCache:
+    # Holds one menu snapshot tagged with the menu version it was built at. Admin writes
+    # bump the version; max_age bounds staleness from changes the version does not see
+    # (stock taken by checkouts, writes handled by other worker processes).
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot: MenuSnapshot | None = None
+        self._etag: str | None = None
+        self._encoded: dict[str, bytes] = {}
+        self._categories: tuple[dict[int, CategoryOut], dict[str, CategoryOut]] | None = None
+        self._snapshot_version = -1
+        # Latest version a primary read has seen; a replica may still lag anything newer.
+        self._confirmed_version = 0
+        self._built_at = 0.0
+        self._building: threading.Event | None = None
+        self._builder_thread: int | None = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+        self.rebuild_ms_total = 0.0
+        self.last_rebuild_ms = 0.0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump(self) -> int:
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def needs_primary(self) -> bool:
+        # After a bump, rebuild from the primary: a lagging replica would hand back the
+        # menu from before the write, and it would be cached under the new version.
+        with self._lock:
+            return self._version > self._confirmed_version
+
+    def _fresh(self) -> bool:
+        return (
+            self._snapshot is not None
+            and self._snapshot_version == self._version
+            and time.monotonic() - self._built_at < self.max_age
+        )
+
+    def current_etag(self) -> str | None:
+        # Answers conditional requests without touching the database.
+        with self._lock:
+            return self._etag if self._fresh() else None
+
+    def get_or_build(self, build: Callable[[], MenuSnapshot]) -> MenuSnapshot:
+        return self.get_with_etag(build)[0]
+
+    def get_with_etag(self, build: Callable[[], MenuSnapshot],
+                      from_replica: bool = False) -> tuple[MenuSnapshot, str]:
+        if self.max_age <= 0:
+            snapshot = build()
+            return snapshot, content_etag(snapshot)
+
+        while True:
+            with self._lock:
+                if self._fresh():
+                    self.hits += 1
+                    return self._snapshot, self._etag
+
+                building = self._building
+                # Under the async runner every build runs on the event loop thread;
+                # waiting there would block the build we wait for, so build instead.
+                if building is None or self._builder_thread == threading.get_ident():
+                    self.misses += 1
+                    self._building = building = threading.Event()
+                    self._builder_thread = threading.get_ident()
+                    version = self._version
+                    break
+
+            # Single flight: one caller rebuilds, the others wait and then re-check.
+            building.wait()
+
+        started = time.perf_counter()
+        try:
+            snapshot = build()
+            etag = content_etag(snapshot)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            with self._lock:
+                self.rebuilds += 1
+                self.rebuild_ms_total += elapsed_ms
+                self.last_rebuild_ms = elapsed_ms
+                if not from_replica:
+                    self._confirmed_version = max(self._confirmed_version, version)
+                # A write during the build leaves this snapshot tagged with the older
+                # version, so the next read rebuilds. A replica build of a version no
+                # primary read has confirmed may predate the write and is not cached.
+                if self._snapshot_version <= version <= self._confirmed_version:
+                    self._snapshot = snapshot
+                    self._etag = etag
+                    self._encoded = {}
+                    self._categories = None
+                    self._snapshot_version = version
+                    self._built_at = time.monotonic()
+
+        finally:
+            # Stored before waking the waiters so they find it instead of rebuilding.
+            with self._lock:
+                if self._building is building:
+                    self._building = None
+                    self._builder_thread = None
+            building.set()
+
+        return snapshot, etag
+
+    def current_encoded(self, variant: str) -> tuple[str, bytes] | None:
+        with self._lock:
+            if self._fresh() and variant in self._encoded:
+                self.hits += 1
+                return self._etag, self._encoded[variant]
+            return None
+
+    def encoded(self, variant: str, etag: str, encode: Callable[[], bytes]) -> bytes:
+        # Response bytes per representation of the cached snapshot, dropped with it.
+        with self._lock:
+            content = self._encoded.get(variant) if etag == self._etag else None
+        if content is not None:
+            return content
+
+        content = encode()
+        with self._lock:
+            if etag == self._etag:
+                self._encoded[variant] = content
+        return content
+
+    def categories(self, snapshot: MenuSnapshot, etag: str) -> tuple[dict[int, CategoryOut], dict[str, CategoryOut]]:
+        # Categories of the cached snapshot by id and by name, built once per snapshot.
+        with self._lock:
+            index = self._categories if etag == self._etag else None
+        if index is not None:
+            return index
+
+        index = ({category.id: category for category in snapshot.categories},
+                 {category.name: category for category in snapshot.categories})
+        with self._lock:
+            if etag == self._etag:
+                self._categories = index
+        return index
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rebuilds": self.rebuilds,
+                "last_rebuild_ms": round(self.last_rebuild_ms, 3),
+                "avg_rebuild_ms": round(self.rebuild_ms_total / self.rebuilds, 3) if self.rebuilds else 0.0,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._etag = None
+            self._encoded = {}
+            self._categories = None
+            self._snapshot_version = -1
+            self._confirmed_version = self._version
+            self.hits = 0
+            self.misses = 0
+            self.rebuilds = 0
+            self.rebuild_ms_total = 0.0
+            self.last_rebuild_ms = 0.0
+
+menu_cache = MenuCache(MENU_CACHE_MAX_AGE_SECONDS)
+metrics.register_collector("menu_cache", menu_cache.stats)
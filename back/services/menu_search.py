@@ -0,0 +1,226 @@
+import bisect
+import heapq
+import logging
+import operator
+import threading
+import time
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Callable
+
+from back.core import metrics
+from back.core.search_text import tokenize
+from back.models.menu import MenuItemOut, MenuSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Same as pg_trgm's default similarity_threshold.
+FUZZY_THRESHOLD = 0.3
+
+# Name matches rank above description matches; exact words above prefixes, prefixes
+# above typo-tolerant trigram matches.
+_NAME_WEIGHT = 2.0
+_DESCRIPTION_WEIGHT = 1.0
+
+def _trigrams(term: str) -> set[str]:
+    # Padded the way pg_trgm pads words.
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class MenuSearchIndex:
+    # Inverted index over item names and descriptions for databases without trigram or
+    # full-text indexes. It is built from one menu snapshot and replaced along with it.
+    def __init__(self, items: list[MenuItemOut]):
+        # Items are numbered in (name, id) order, so posting lists come out sorted in the
+        # order ties are ranked and the smallest positions are the first results.
+        self._items = sorted(items, key=lambda item: (item.name, item.id))
+        self._postings: dict[str, dict[float, list[int]]] = defaultdict(lambda: defaultdict(list))
+
+        for position, item in enumerate(self._items):
+            for weight, text in ((_NAME_WEIGHT, item.name), (_DESCRIPTION_WEIGHT, item.description)):
+                for term in dict.fromkeys(tokenize(text)):
+                    self._postings[term][weight].append(position)
+
+        self._terms = sorted(self._postings)
+        self._term_trigrams: dict[str, int] = {}
+        self._trigram_terms: dict[str, list[str]] = defaultdict(list)
+
+        for term in self._terms:
+            trigrams = _trigrams(term)
+            self._term_trigrams[term] = len(trigrams)
+            for trigram in trigrams:
+                self._trigram_terms[trigram].append(term)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: MenuSnapshot) -> "MenuSearchIndex":
+        return cls([item for category in snapshot.categories for item in category.items])
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _matching_terms(self, token: str) -> dict[str, float]:
+        matches = {token: 1.0} if token in self._postings else {}
+
+        position = bisect.bisect_left(self._terms, token)
+        while position < len(self._terms) and self._terms[position].startswith(token):
+            term = self._terms[position]
+            matches.setdefault(term, 0.5 + 0.3 * len(token) / len(term))
+            position += 1
+
+        trigrams = _trigrams(token)
+        shared = Counter(chain.from_iterable(self._trigram_terms.get(trigram, ()) for trigram in trigrams))
+
+        for term, count in shared.items():
+            if term in matches:
+                continue
+            similarity = count / (len(trigrams) + self._term_trigrams[term] - count)
+            if similarity >= FUZZY_THRESHOLD:
+                matches[term] = 0.5 * similarity
+
+        return matches
+
+    def _hits(self, token: str) -> list[tuple[float, list[int]]]:
+        return [
+            (quality * weight, positions)
+            for term, quality in self._matching_terms(token).items()
+            for weight, positions in self._postings[term].items()
+        ]
+
+    def _top_single(self, hits: list[tuple[float, list[int]]], limit: int) -> list[int]:
+        # An item's score is its best hit, so walking the score levels from the top and
+        # each level in position order yields results already ranked; stop at the limit.
+        levels: dict[float, list[list[int]]] = defaultdict(list)
+        for score, positions in hits:
+            levels[score].append(positions)
+
+        ranked: list[int] = []
+        seen: set[int] = set()
+        for score in sorted(levels, reverse=True):
+            for position in heapq.merge(*levels[score]):
+                if position not in seen:
+                    seen.add(position)
+                    ranked.append(position)
+                    if len(ranked) == limit:
+                        return ranked
+        return ranked
+
+    def _scores(self, hits: list[tuple[float, list[int]]], candidates) -> dict[int, float]:
+        # Best score per candidate item. Ascending order lets better hits overwrite weaker
+        # ones; the keys view intersection runs over each posting list in C.
+        scores: dict[int, float] = {}
+        for score, positions in sorted(hits, key=operator.itemgetter(0)):
+            scores.update(dict.fromkeys(candidates & positions, score))
+        return scores
+
+    def search(self, query: str, limit: int) -> list[MenuItemOut]:
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or limit <= 0:
+            return []
+
+        hits = [self._hits(token) for token in tokens]
+        if len(hits) == 1:
+            return [self._items[position] for position in self._top_single(hits[0], limit)]
+
+        # Every word of the query has to match, like the & in the Postgres tsquery, so
+        # the word with the fewest postings picks the candidates and each other word
+        # only narrows them down.
+        if not all(hits):
+            return []
+        order = sorted(range(len(hits)), key=lambda i: sum(len(positions) for _, positions in hits[i]))
+        candidates = dict.fromkeys(chain.from_iterable(positions for _, positions in hits[order[0]]))
+
+        token_scores: list[dict[int, float]] = [{}] * len(hits)
+        for i in order[1:]:
+            token_scores[i] = candidates = self._scores(hits[i], candidates.keys())
+            if not candidates:
+                return []
+        token_scores[order[0]] = self._scores(hits[order[0]], candidates.keys())
+
+        # Summed in query order, so the ranking does not depend on the narrowing order.
+        scores = dict.fromkeys(candidates, 0.0)
+        for token_score in token_scores:
+            scores = dict(zip(scores, map(operator.add, scores.values(), map(token_score.__getitem__, scores))))
+
+        best = heapq.nsmallest(limit, zip(map(operator.neg, scores.values()), scores.keys()))
+        return [self._items[position] for _, position in best]
+
+class MenuSearchIndexCache:
+    # Keeps the index for the latest menu snapshot, keyed by the snapshot's ETag. After a
+    # menu write the next search starts a rebuild on a background thread and answers from
+    # the previous index until the new one is ready, so searches never wait for a build;
+    # only the first index of the process is built in line (warm_up does it at startup).
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._etag: str | None = None
+        self._index: MenuSearchIndex | None = None
+        self._builder: threading.Thread | None = None
+        self.builds = 0
+        self.stale_reads = 0
+        self.last_build_ms = 0.0
+
+    def get(self, etag: str, build: Callable[[], MenuSearchIndex]) -> MenuSearchIndex:
+        with self._lock:
+            if self._index is None:
+                # Under the lock, so concurrent first searches share one build.
+                self._install(etag, *self._timed(build))
+
+            elif self._etag != etag:
+                self.stale_reads += 1
+                if self._builder is None:
+                    self._builder = threading.Thread(target=self._rebuild, args=(etag, build),
+                                                     name="menu-search-index", daemon=True)
+                    self._builder.start()
+
+            return self._index
+
+    def _timed(self, build: Callable[[], MenuSearchIndex]) -> tuple[MenuSearchIndex, float]:
+        started = time.perf_counter()
+        index = build()
+        return index, (time.perf_counter() - started) * 1000
+
+    def _install(self, etag: str, index: MenuSearchIndex, elapsed_ms: float) -> None:
+        self._index = index
+        self._etag = etag
+        self.builds += 1
+        self.last_build_ms = elapsed_ms
+
+    def _rebuild(self, etag: str, build: Callable[[], MenuSearchIndex]) -> None:
+        try:
+            index, elapsed_ms = self._timed(build)
+            with self._lock:
+                self._install(etag, index, elapsed_ms)
+
+        except Exception:
+            logger.exception("Failed to rebuild the menu search index")
+
+        finally:
+            with self._lock:
+                self._builder = None
+
+    def wait(self) -> None:
+        # Lets a running background rebuild finish.
+        builder = self._builder
+        if builder is not None:
+            builder.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "items": len(self._index) if self._index is not None else 0,
+                "builds": self.builds,
+                "stale_reads": self.stale_reads,
+                "rebuilding": self._builder is not None,
+                "last_build_ms": round(self.last_build_ms, 3),
+            }
+
+    def clear(self) -> None:
+        self.wait()
+        with self._lock:
+            self._etag = None
+            self._index = None
+            self.builds = 0
+            self.stale_reads = 0
+            self.last_build_ms = 0.0
+
+menu_search_index = MenuSearchIndexCache()
+metrics.register_collector("menu_search_index", menu_search_index.stats)
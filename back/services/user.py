@@ -1,33 +1,94 @@
 from sqlalchemy.orm import Session
 from back.models.user import User_Create, UserUpdate
 from fastapi import HTTPException
-from back.core.security import verify_password, hash_password
+from fastapi.concurrency import run_in_threadpool
+from back.core.config import PASSWORD_HASH_RETRY_AFTER_SECONDS
+from back.core.rate_limit import login_rate_limiter
+from back.core.security import verify_password_async, hash_password_async, needs_rehash, PasswordHasherBusyError
 from back.crud.user import create_user, get_user_by_email, get_user_by_phone_number, get_user_by_username, get_user_by_id, set_admin_role, update_user_profile, update_user_password
 
 
+def _hashing_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy, please try again later",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+def _login_rate_limit_keys(email: str, client_ip: str | None) -> list[str]:
+    keys = [f"login:email:{email.lower()}"]
+    if client_ip:
+        keys.append(f"login:ip:{client_ip}")
+    return keys
+
+def _check_login_rate_limit(email: str, client_ip: str | None) -> None:
+    keys = _login_rate_limit_keys(email, client_ip)
+    retry_after = login_rate_limiter.hit(*keys)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+def _refund_login_rate_limit(email: str, client_ip: str | None) -> None:
+    # Only failed attempts count: users sharing an IP should not throttle each other
+    # by logging in successfully.
+    login_rate_limiter.refund(*_login_rate_limit_keys(email, client_ip))
+
 class UserService:
     def __init__(self, db: Session):
         self.db = db
     
-    def register_user(self, user_in: User_Create):
-        if get_user_by_email(self.db, user_in.email):
+    async def register_user_async(self, user_in: User_Create):
+        if await run_in_threadpool(get_user_by_email, self.db, user_in.email):
             raise HTTPException(status_code=400, detail="Email already exists")
-        
-        if get_user_by_username(self.db, user_in.username):
+
+        if await run_in_threadpool(get_user_by_username, self.db, user_in.username):
             raise HTTPException(status_code=400, detail="Username already exists")
 
-        user = create_user(self.db, user_in)
+        try:
+            hashed_password = await hash_password_async(user_in.password)
+        except PasswordHasherBusyError:
+            raise _hashing_unavailable()
 
-        return user
+        return await run_in_threadpool(create_user, self.db, user_in, hashed_password)
 
-    def login_user(self, email: str, password: str):
-        user = get_user_by_email(self.db, email)
+    async def login_user_async(self, email: str, password: str, client_ip: str | None = None):
+        # The SQLite limiter backend takes a file lock, so limiter calls stay off the event loop.
+        await run_in_threadpool(_check_login_rate_limit, email, client_ip)
+        user = await run_in_threadpool(get_user_by_email, self.db, email)
 
-        if not user or not verify_password(password, user.hashed_password):
+        if not user:
             raise HTTPException(status_code=401, detail="Invalid email or password")
-        
+
+        try:
+            is_valid = await verify_password_async(password, user.hashed_password)
+        except PasswordHasherBusyError:
+            raise _hashing_unavailable()
+
+        if not is_valid:
+            raise HTTPException(status_code=401, detail="Invalid email or password")
+
+        await run_in_threadpool(_refund_login_rate_limit, email, client_ip)
+        if needs_rehash(user.hashed_password):
+            try:
+                new_hashed_pwd = await hash_password_async(password)
+                await run_in_threadpool(update_user_password, self.db, user, new_hashed_pwd)
+            except PasswordHasherBusyError:
+                # The login itself succeeded; the migration will happen on a later login.
+                pass
+
         return user
     
+    def get_user(self, user_id: int):
+        user = get_user_by_id(self.db, user_id)
+
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        return user
+
     def set_user_role_admin(self, user_id: int):
         user = get_user_by_id(self.db, user_id)
 
@@ -69,21 +130,15 @@ class UserService:
 
         return update_user_profile(self.db, user, user_in)
     
-    def update_user_password(self, user, old_password: str, new_password: str):
-        if not verify_password(old_password, user.hashed_password):
-            raise HTTPException(status_code=400, detail="Current password is incorrect")
-        
-        new_hashed_pwd = hash_password(new_password)
-
-        return update_user_password(self.db, user, new_hashed_pwd)
-    
+    async def update_user_password_async(self, user_id: int, old_password: str, new_password: str):
+        user = await run_in_threadpool(self.get_user, user_id)
 
+        try:
+            if not await verify_password_async(old_password, user.hashed_password):
+                raise HTTPException(status_code=400, detail="Current password is incorrect")
 
+            new_hashed_pwd = await hash_password_async(new_password)
+        except PasswordHasherBusyError:
+            raise _hashing_unavailable()
 
-        
-        
-
-    
-
-
-        
\ No newline at end of file
+        return await run_in_threadpool(update_user_password, self.db, user, new_hashed_pwd)
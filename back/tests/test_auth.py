@@ -1,4 +1,12 @@
 import pytest
+import bcrypt
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+from back.core import security
+from back.core.security import create_access_token
+from back.core.rate_limit import RateLimiter, SQLiteRateLimitStorage, login_rate_limiter
 
 def test_register_user(client):
     response = client.post("/auth/register", 
@@ -66,4 +74,93 @@ def test_login_missing_fields(client):
         "email": "test@example.com"
     })
 
-    assert response.status_code == 422
\ No newline at end of file
+    assert response.status_code == 422
+
+def test_login_hashing_pool_saturated(client, user, monkeypatch):
+    monkeypatch.setattr("back.core.security._hash_slots", threading.BoundedSemaphore(1))
+    security._hash_slots.acquire()
+
+    response = client.post("/auth/login", json={
+        "email": "testuser@example.com",
+        "password": "Password123"
+    })
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+def test_decode_access_token_is_cached(user):
+    token = create_access_token(data={"sub": str(user.id), "role": user.role})
+    hits = security._token_cache.hits
+
+    assert security.decode_access_token(token)["sub"] == str(user.id)
+    assert security.decode_access_token(token)["sub"] == str(user.id)
+    assert security._token_cache.hits == hits + 1
+
+def test_decode_access_token_rejects_expired_cached_token(user, monkeypatch):
+    token = create_access_token(data={"sub": str(user.id), "role": user.role})
+    assert security.decode_access_token(token) is not None
+
+    future = time.time() + timedelta(hours=1).total_seconds()
+    monkeypatch.setattr(security, "time", SimpleNamespace(time=lambda: future, monotonic=time.monotonic))
+
+    assert security.decode_access_token(token) is None
+
+def test_login_rehashes_legacy_password(client, db, user):
+    user.hashed_password = bcrypt.hashpw(b"Password123", bcrypt.gensalt(rounds=4)).decode()
+    db.commit()
+
+    response = client.post("/auth/login", json={
+        "email": "testuser@example.com",
+        "password": "Password123"
+    })
+
+    assert response.status_code == 200
+
+    db.refresh(user)
+    assert not security.needs_rehash(user.hashed_password)
+    assert security.verify_password("Password123", user.hashed_password)
+
+def test_login_rate_limited(client, user, monkeypatch):
+    monkeypatch.setattr(login_rate_limiter, "limit", 2)
+
+    for _ in range(2):
+        response = client.post("/auth/login", json={
+            "email": "testuser@example.com",
+            "password": "WrongPassword"
+        })
+        assert response.status_code == 401
+
+    response = client.post("/auth/login", json={
+        "email": "testuser@example.com",
+        "password": "Password123"
+    })
+
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) > 0
+
+def test_successful_logins_do_not_use_up_the_rate_limit(client, user, monkeypatch):
+    monkeypatch.setattr(login_rate_limiter, "limit", 2)
+
+    for _ in range(4):
+        response = client.post("/auth/login", json={
+            "email": "testuser@example.com",
+            "password": "Password123"
+        })
+        assert response.status_code == 200
+
+def test_sqlite_rate_limit_storage_refunds(tmp_path):
+    limiter = RateLimiter(SQLiteRateLimitStorage(str(tmp_path / "rate_limit.db")), limit=1, window_seconds=60)
+
+    assert limiter.hit("login:ip:1.2.3.4") == 0
+    limiter.refund("login:ip:1.2.3.4")
+    assert limiter.hit("login:ip:1.2.3.4") == 0
+    assert limiter.hit("login:ip:1.2.3.4") > 0
+
+def test_sqlite_rate_limit_storage_shares_buckets(tmp_path):
+    path = str(tmp_path / "rate_limit.db")
+    first = RateLimiter(SQLiteRateLimitStorage(path), limit=2, window_seconds=60)
+    second = RateLimiter(SQLiteRateLimitStorage(path), limit=2, window_seconds=60)
+
+    assert first.hit("login:ip:1.2.3.4") == 0
+    assert second.hit("login:ip:1.2.3.4") == 0
+    assert first.hit("login:ip:1.2.3.4") > 0
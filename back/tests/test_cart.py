@@ -1,6 +1,28 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+from sqlalchemy import delete
 from back.db.menu import Category, MenuItem
-from back.tests.conftest import client
+from back.db.order_items import OrderItem
+from back.db.user import User
+from back.models.orders import AddToCartRequest, UpdateCartItemRequest
+import back.services.cart as cart_service
+from back.services.cart import CartService
+from back.services.cart_store import MemoryCartStore
+from back.services.domain_errors import StockUnavailableError
+from back.tests.conftest import client, TestingSessionLocal
+from back.db.order import Order
+from back.core.idempotency import IdempotencyStore, MemoryIdempotencyStorage, SQLiteIdempotencyStorage
+import back.crud.cart as cart_crud
+from back.db.unit_of_work import COMMIT_COUNT, reset_counters, run_in_transaction
+from back.jobs.cart_totals import check_cart_totals
+from back.jobs.abandoned_carts import sweep_abandoned_carts
+from back.db.lazy_load_guard import LazyLoadError
+
+pytestmark = pytest.mark.usefixtures("no_lazy_loads")
 
 def test_add_item_to_cart(client, user_token_header, menu_item):
     response = client.post(
@@ -15,6 +37,125 @@ def test_add_item_to_cart(client, user_token_header, menu_item):
     assert response.status_code == 200
 
 
+def test_add_item_with_idempotency_key_applies_once(client, user_token_header, menu_item):
+    headers = {**user_token_header, "Idempotency-Key": "retry-1"}
+    body = {"menu_item_id": menu_item.id, "quantity": 2}
+
+    first = client.post("/cart/add-item", headers=headers, json=body)
+    retry = client.post("/cart/add-item", headers=headers, json=body)
+
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert client.get("/cart/cart-items", headers=user_token_header).json()["items"][0]["quantity"] == 2
+
+    reused = client.post("/cart/add-item", headers=headers, json={"menu_item_id": menu_item.id, "quantity": 5})
+
+    assert reused.status_code == 422
+
+
+def test_place_order_with_idempotency_key_replays_order(client, db, user, user_token_header, menu_item):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 1})
+    headers = {**user_token_header, "Idempotency-Key": "checkout-1"}
+
+    first = client.post("/cart/place-order", headers=headers)
+    retry = client.post("/cart/place-order", headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json()["order_id"] == first.json()["order_id"]
+    assert db.query(Order).filter(Order.user_id == user.id, Order.status == "placed").count() == 1
+
+
+def test_concurrent_duplicates_wait_for_in_flight_result():
+    store = IdempotencyStore(MemoryIdempotencyStorage(max_size=10, ttl=60))
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        return await asyncio.gather(*(store.run("scope", "key", "fp", work) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [1] * 5
+    assert sorted(replayed for _, replayed in results) == [False] + [True] * 4
+
+
+def test_replayed_error_carries_the_replayed_header(client, user_token_header):
+    headers = {**user_token_header, "Idempotency-Key": "checkout-empty"}
+
+    first = client.post("/cart/place-order", headers=headers)
+    retry = client.post("/cart/place-order", headers=headers)
+
+    assert first.status_code == retry.status_code
+    assert first.status_code in (400, 409)
+    assert retry.json() == first.json()
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.headers["Idempotent-Replayed"] == "true"
+
+
+def test_sqlite_idempotency_storage_shares_outcomes_between_workers(tmp_path):
+    path = str(tmp_path / "idempotency.db")
+    first = IdempotencyStore(SQLiteIdempotencyStorage(path, ttl=60))
+    second = IdempotencyStore(SQLiteIdempotencyStorage(path, ttl=60))
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return {"order_id": len(calls)}
+
+    async def main():
+        await first.run("scope", "key", "fp", work)
+        return await second.run("scope", "key", "fp", work)
+
+    assert asyncio.run(main()) == ({"order_id": 1}, True)
+    assert len(calls) == 1
+
+
+def test_sqlite_idempotency_storage_waits_for_another_worker(tmp_path):
+    path = str(tmp_path / "idempotency.db")
+    owner = SQLiteIdempotencyStorage(path, ttl=60)
+    store = IdempotencyStore(SQLiteIdempotencyStorage(path, ttl=60))
+
+    assert owner.claim('["scope", "key"]') is None
+
+    async def work():
+        raise AssertionError("the key is owned by another worker")
+
+    async def finish_elsewhere():
+        await asyncio.sleep(0.1)
+        owner.store('["scope", "key"]', ("fp", {"order_id": 7}, None))
+
+    async def main():
+        result, _ = await asyncio.gather(store.run("scope", "key", "fp", work), finish_elsewhere())
+        return result
+
+    assert asyncio.run(main()) == ({"order_id": 7}, True)
+
+
+def test_get_or_create_cart_yields_to_a_parallel_creator(db, user, monkeypatch):
+    real_get_cart = cart_crud.get_cart
+    lookups = []
+
+    def get_cart_after_race(db, user_id):
+        # The first lookup misses; another request then creates the cart before our insert.
+        if not lookups:
+            lookups.append(user_id)
+            db.add(Order(user_id=user_id, status="cart", total_price_cents=0))
+            db.flush()
+            return None
+        return real_get_cart(db, user_id)
+
+    monkeypatch.setattr(cart_crud, "get_cart", get_cart_after_race)
+
+    cart = cart_crud.get_or_create_cart(db, user.id)
+
+    assert db.query(Order).filter(Order.user_id == user.id, Order.status == "cart").all() == [cart]
+
+
 def test_add_item_to_cart_invalid_item(client, user_token_header):
     response = client.post(
         "/cart/add-item",
@@ -58,6 +199,71 @@ def test_get_cart_items(client, user_token_header, menu_item):
     assert response.status_code == 200
 
 
+def test_cart_batch_applies_operations_in_one_commit(client, db, user_token_header, category, menu_item):
+    other = MenuItem(name="Calzone", price_cents=900, stock=5, is_available=True, category_id=category.id)
+    db.add(other)
+    db.commit()
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 1})
+    reset_counters(db)
+
+    response = client.post("/cart/batch", headers=user_token_header, json={"operations": [
+        {"op": "add", "menu_item_id": other.id, "quantity": 2},
+        {"op": "set", "menu_item_id": menu_item.id, "quantity": 3},
+        {"op": "add", "menu_item_id": other.id, "quantity": 1},
+        {"op": "remove", "menu_item_id": menu_item.id},
+        {"op": "add", "menu_item_id": menu_item.id, "quantity": 1},
+    ]})
+
+    assert response.status_code == 200
+    assert db.info[COMMIT_COUNT] == 1
+    data = response.json()
+    assert {item["menu_item_id"]: item["quantity"] for item in data["items"]} == {menu_item.id: 1, other.id: 3}
+    assert data["total_price_cents"] == 1500 + 3 * 900
+    assert check_cart_totals(db)["drifted"] == 0
+
+
+def test_cart_batch_rejects_invalid_operation_atomically(client, user_token_header, menu_item):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 1})
+
+    response = client.post("/cart/batch", headers=user_token_header, json={"operations": [
+        {"op": "set", "menu_item_id": menu_item.id, "quantity": 4},
+        {"op": "remove", "menu_item_id": 999999},
+    ]})
+
+    assert response.status_code == 400
+    cart = client.get("/cart/cart-items", headers=user_token_header).json()
+    assert cart["items"][0]["quantity"] == 1
+    assert cart["total_price_cents"] == 1500
+
+
+def test_cart_read_reuses_encoded_bytes_until_the_cart_changes(client, user_token_header, menu_item, select_queries):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 1})
+    first = client.get("/cart/cart-items", headers=user_token_header)
+
+    select_queries.clear()
+    second = client.get("/cart/cart-items", headers=user_token_header)
+
+    assert second.content == first.content
+    # Only the cart row lookup; the lines are not re-read or re-encoded.
+    assert len(select_queries) == 1
+
+    client.patch("/cart/update-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 4})
+    third = client.get("/cart/cart-items", headers=user_token_header).json()
+
+    assert third["items"][0]["quantity"] == 4
+    assert third["total_price_cents"] == 6000
+
+
+def test_cart_read_picks_up_menu_item_renames(client, user_token_header, admin_token_header, menu_item):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 1})
+    client.get("/cart/cart-items", headers=user_token_header)
+
+    client.patch(f"/menu/update_item/{menu_item.id}", headers=admin_token_header, json={"name": "Diavola"})
+    cart = client.get("/cart/cart-items", headers=user_token_header).json()
+
+    assert cart["items"][0]["name"] == "Diavola"
+
+
 def test_get_cart_items_unauthorized(client):
     response = client.get("/cart/cart-items")
 
@@ -172,6 +378,118 @@ def test_place_order(client, user_token_header, menu_item):
     assert "order_id" in data
 
 
+def test_place_order_reserves_stock(client, db, user_token_header, menu_item):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 3})
+
+    response = client.post("/cart/place-order", headers=user_token_header)
+
+    assert response.status_code == 200
+    db.refresh(menu_item)
+    assert menu_item.stock == 7
+
+
+def test_place_order_rolls_back_when_a_line_is_short(client, db, user_token_header, category, menu_item):
+    scarce = MenuItem(name="Truffle", price_cents=3000, stock=1, is_available=True, category_id=category.id)
+    db.add(scarce)
+    db.commit()
+
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 2})
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": scarce.id, "quantity": 2})
+
+    response = client.post("/cart/place-order", headers=user_token_header)
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["unavailable_lines"] == [
+        {"menu_item_id": scarce.id, "name": "Truffle", "requested": 2, "available": 1}
+    ]
+
+    db.refresh(menu_item)
+    db.refresh(scarce)
+    assert (menu_item.stock, scarce.stock) == (10, 1)
+    assert client.get("/cart/cart-items", headers=user_token_header).json()["status"] == "cart"
+
+
+@pytest.fixture
+def contended_item():
+    stock, buyers = 5, 20
+
+    with TestingSessionLocal() as db:
+        category = Category(name="Rush hour")
+        db.add(category)
+        db.flush()
+        item = MenuItem(name="Margherita", price_cents=1000, stock=stock, is_available=True, category_id=category.id)
+        users = [
+            User(username=f"buyer{i}", email=f"buyer{i}@example.com", hashed_password="x", phone_number=str(i))
+            for i in range(buyers)
+        ]
+        db.add_all([item, *users])
+        db.flush()
+        for user in users:
+            run_in_transaction(db, lambda db, user_id: CartService(db).add_item_to_cart(
+                user_id, AddToCartRequest(menu_item_id=item.id, quantity=1)), user.id)
+        ids = (category.id, item.id, [user.id for user in users])
+
+    yield stock, ids
+
+    category_id, item_id, user_ids = ids
+    with TestingSessionLocal() as db:
+        order_ids = db.query(Order.id).filter(Order.user_id.in_(user_ids))
+        db.execute(delete(OrderItem).where(OrderItem.order_id.in_(order_ids)))
+        db.execute(delete(Order).where(Order.user_id.in_(user_ids)))
+        db.execute(delete(User).where(User.id.in_(user_ids)))
+        db.execute(delete(MenuItem).where(MenuItem.id == item_id))
+        db.execute(delete(Category).where(Category.id == category_id))
+        db.commit()
+
+
+def test_concurrent_checkouts_never_oversell(contended_item):
+    stock, (_, item_id, user_ids) = contended_item
+    start = threading.Barrier(len(user_ids))
+
+    def checkout(user_id):
+        start.wait()
+        with TestingSessionLocal() as db:
+            try:
+                run_in_transaction(db, lambda db: CartService(db).place_order(user_id))
+                return "placed"
+
+            except StockUnavailableError:
+                return "rejected"
+
+    with ThreadPoolExecutor(max_workers=len(user_ids)) as pool:
+        outcomes = list(pool.map(checkout, user_ids))
+
+    with TestingSessionLocal() as db:
+        remaining = db.get(MenuItem, item_id).stock
+
+    assert outcomes.count("placed") == stock
+    assert outcomes.count("rejected") == len(user_ids) - stock
+    assert remaining == 0
+
+
+def test_concurrent_cart_edits_keep_the_total_in_step_with_the_lines(contended_item):
+    _, (_, item_id, user_ids) = contended_item
+    user_id = user_ids[0]
+    edits = [AddToCartRequest(menu_item_id=item_id, quantity=1), UpdateCartItemRequest(menu_item_id=item_id, quantity=3)] * 10
+    start = threading.Barrier(len(edits))
+
+    def edit(item_in):
+        start.wait()
+        with TestingSessionLocal() as db:
+            service = CartService(db)
+            change = service.add_item_to_cart if isinstance(item_in, AddToCartRequest) else service.update_cart_item_quantity
+            run_in_transaction(db, lambda db: change(user_id, item_in))
+
+    with ThreadPoolExecutor(max_workers=len(edits)) as pool:
+        list(pool.map(edit, edits))
+
+    with TestingSessionLocal() as db:
+        cart = cart_crud.get_cart(db, user_id)
+        line = db.query(OrderItem).filter(OrderItem.order_id == cart.id).one()
+
+        assert cart.total_price_cents == line.quantity * line.price_cents_snapshot
+
+
 def test_place_order_empty_cart(client, user_token_header):
     response = client.post(
         "/cart/place-order",
@@ -205,11 +523,263 @@ def test_get_order_history(client, user_token_header, menu_item):
 
     data = response.json()
 
-    assert isinstance(data, list)
-    assert len(data) >= 1
+    assert isinstance(data["orders"], list)
+    assert len(data["orders"]) >= 1
+
+
+def test_order_history_lists_only_placed_orders(client, db, user, user_token_header, menu_item):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 1})
+    placed = client.post("/cart/place-order", headers=user_token_header).json()["order_id"]
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 1})
+    db.add(Order(user_id=user.id, status="abandoned", total_price_cents=1500))
+    db.commit()
+
+    for summary in (False, True):
+        response = client.get("/cart/orders", headers=user_token_header, params={"summary": summary})
+
+        assert [order["order_id"] for order in response.json()["orders"]] == [placed]
+
+
+def test_order_history_does_not_lazy_load(client, db, user_token_header, menu_item):
+    for quantity in (1, 2):
+        client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": quantity})
+        client.post("/cart/place-order", headers=user_token_header)
+
+    db.expire_all()
+    response = client.get("/cart/orders", headers=user_token_header)
+
+    assert response.status_code == 200
+    orders = response.json()["orders"]
+    assert [len(order["items"]) for order in orders] == [1, 1]
+    assert orders[0]["items"][0]["product_name"] == "Pepperoni"
+
+    order = db.query(Order).filter(Order.status != "cart").first()
+    with pytest.raises(LazyLoadError):
+        order.items
+
+
+def test_order_history_keyset_pagination(client, user_token_header, menu_item):
+    for _ in range(5):
+        client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 1})
+        client.post("/cart/place-order", headers=user_token_header)
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/cart/orders", headers=user_token_header, params=params).json()
+        assert len(page["orders"]) <= 2
+        seen.extend(order["order_id"] for order in page["orders"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 5
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_order_history_summary_and_bad_cursor(client, user_token_header, menu_item):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 1})
+    client.post("/cart/place-order", headers=user_token_header)
+
+    response = client.get("/cart/orders", headers=user_token_header, params={"summary": True})
+
+    assert response.status_code == 200
+    assert "items" not in response.json()["orders"][0]
+    assert response.json()["next_cursor"] is None
+
+    response = client.get("/cart/orders", headers=user_token_header, params={"cursor": "not-a-cursor"})
+
+    assert response.status_code == 400
 
 
 def test_get_order_history_unauthorized(client):
     response = client.get("/cart/orders")
 
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+def test_add_item_commits_once(client, db, user_token_header, menu_item):
+    reset_counters(db)
+
+    response = client.post(
+        "/cart/add-item",
+        headers=user_token_header,
+        json={
+            "menu_item_id": menu_item.id,
+            "quantity": 2
+        }
+    )
+
+    assert response.status_code == 200
+    assert db.info[COMMIT_COUNT] == 1
+
+
+def test_failed_add_item_rolls_back(client, db, user, user_token_header):
+    reset_counters(db)
+
+    response = client.post(
+        "/cart/add-item",
+        headers=user_token_header,
+        json={
+            "menu_item_id": 999999,
+            "quantity": 1
+        }
+    )
+
+    assert response.status_code == 400
+    assert db.info[COMMIT_COUNT] == 0
+    assert db.query(Order).filter(Order.user_id == user.id).count() == 0
+
+
+def test_add_same_item_twice_merges_line(client, user_token_header, menu_item):
+    for quantity in (2, 3):
+        response = client.post(
+            "/cart/add-item",
+            headers=user_token_header,
+            json={
+                "menu_item_id": menu_item.id,
+                "quantity": quantity
+            }
+        )
+
+    data = response.json()
+
+    assert response.status_code == 200
+    assert len(data["items"]) == 1
+    assert data["items"][0]["quantity"] == 5
+    assert data["total_price_cents"] == 5 * menu_item.price_cents
+
+
+def test_update_and_remove_keep_total_in_sync(client, db, user, user_token_header, menu_item):
+    client.post(
+        "/cart/add-item",
+        headers=user_token_header,
+        json={
+            "menu_item_id": menu_item.id,
+            "quantity": 2
+        }
+    )
+
+    response = client.patch(
+        "/cart/update-item",
+        headers=user_token_header,
+        json={
+            "menu_item_id": menu_item.id,
+            "quantity": 5
+        }
+    )
+    assert response.json()["total_price_cents"] == 5 * menu_item.price_cents
+
+    response = client.delete(
+        f"/cart/remove-item?menu_item_id={menu_item.id}",
+        headers=user_token_header
+    )
+    assert response.json()["total_price_cents"] == 0
+    assert check_cart_totals(db)["drifted"] == 0
+
+
+def test_check_cart_totals_repairs_drift(client, db, user, user_token_header, menu_item):
+    client.post(
+        "/cart/add-item",
+        headers=user_token_header,
+        json={
+            "menu_item_id": menu_item.id,
+            "quantity": 2
+        }
+    )
+    cart = db.query(Order).filter(Order.user_id == user.id).one()
+    cart.total_price_cents = 1
+    db.commit()
+
+    assert check_cart_totals(db, repair=True) == {"drifted": 1, "repaired": 1}
+
+    db.refresh(cart)
+    assert cart.total_price_cents == 2 * menu_item.price_cents
+
+
+@pytest.fixture
+def memory_store(tmp_path, monkeypatch):
+    store = MemoryCartStore(ttl_seconds=60, snapshot_path=str(tmp_path / "carts.json"), snapshot_interval=3600)
+    monkeypatch.setattr(cart_service, "cart_store", store)
+    yield store
+    store.close()
+
+
+def test_memory_cart_persists_only_at_checkout(client, db, user, user_token_header, menu_item, memory_store):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 2})
+    client.patch("/cart/update-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 3})
+    cart = client.get("/cart/cart-items", headers=user_token_header).json()
+
+    assert cart["items"][0]["quantity"] == 3
+    assert cart["total_price_cents"] == 4500
+    assert db.query(Order).filter(Order.user_id == user.id).count() == 0
+
+    response = client.post("/cart/place-order", headers=user_token_header)
+
+    assert response.status_code == 200
+    order = db.get(Order, response.json()["order_id"])
+    assert (order.status, order.total_price_cents) == ("placed", 4500)
+    db.refresh(menu_item)
+    assert menu_item.stock == 7
+    assert client.get("/cart/cart-items", headers=user_token_header).json()["items"] == []
+
+
+def test_memory_cart_survives_failed_checkout(client, db, user_token_header, menu_item, memory_store):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 11})
+
+    response = client.post("/cart/place-order", headers=user_token_header)
+
+    assert response.status_code == 409
+    assert db.query(Order).count() == 0
+    assert client.get("/cart/cart-items", headers=user_token_header).json()["items"][0]["quantity"] == 11
+
+
+def test_memory_cart_checkout_keeps_lines_added_before_commit(db, user, menu_item, memory_store):
+    memory_store.add_item(db, user.id, AddToCartRequest(menu_item_id=menu_item.id, quantity=2))
+    memory_store.place_order(db, user.id)
+    memory_store.add_item(db, user.id, AddToCartRequest(menu_item_id=menu_item.id, quantity=1))
+    db.commit()
+
+    assert memory_store.get_cart(db, user.id).items[0].quantity == 1
+
+
+def test_memory_cart_rolled_back_checkout_is_not_applied_by_a_later_commit(db, user, menu_item, memory_store):
+    memory_store.add_item(db, user.id, AddToCartRequest(menu_item_id=menu_item.id, quantity=2))
+    memory_store.place_order(db, user.id)
+    db.rollback()
+    db.commit()
+
+    assert memory_store.get_cart(db, user.id).items[0].quantity == 2
+
+
+def test_memory_cart_snapshot_restores_live_carts(client, user, user_token_header, menu_item, memory_store):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 2})
+    memory_store.snapshot()
+
+    restored = MemoryCartStore(ttl_seconds=0, snapshot_path=memory_store.snapshot_path)
+
+    assert restored.get_cart(None, user.id).total_price_cents == 3000
+    # A zero TTL lets the cart lapse right after that read.
+    assert restored.get_cart(None, user.id).items == []
+
+
+def test_sweeper_deletes_only_stale_carts_in_batches(client, db, user, another_user, user_token_header, menu_item):
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 1})
+    client.post("/cart/place-order", headers=user_token_header)
+    client.post("/cart/add-item", headers=user_token_header, json={"menu_item_id": menu_item.id, "quantity": 2})
+
+    stale = [Order(user_id=another_user.id, status=status, total_price_cents=0) for status in ("cart", "abandoned")]
+    db.add_all(stale)
+    db.flush()
+    db.add(OrderItem(order_id=stale[0].id, menu_item_id=menu_item.id, quantity=1, price_cents_snapshot=1500))
+    for order in db.query(Order).filter(Order.user_id == another_user.id):
+        order.updated_at = datetime.utcnow() - timedelta(days=30)
+    db.commit()
+
+    result = sweep_abandoned_carts(db, ttl_seconds=86400, batch_size=1)
+
+    assert result == {"carts": 2, "lines": 1, "batches": 2}
+    assert db.query(Order).filter(Order.user_id == another_user.id).count() == 0
+    assert [order.status for order in db.query(Order).filter(Order.user_id == user.id).order_by(Order.id)] == ["placed", "cart"]
@@ -0,0 +1,312 @@
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from back.db import read_routing, replica
+from back.core.principal_cache import principal_cache
+from back.core.security import create_access_token
+from back.db.async_session import AsyncSessionRunner, async_database_url, async_engine_options, get_session_runner
+from back.db.base import Base
+from back.db.init_db import init_db
+from back.db.order import Order
+from back.db.order_items import OrderItem
+from back.db.user import User
+from back.db.menu import Category, MenuItem
+from back.db.replica import get_user_read_session_runner
+from back.db.session import UnsupportedDatabaseError, check_dialect, get_db
+from back.db.pool import InstrumentedQueuePool, pool_stats, warm_up_pool
+from back.models.menu import MenuSnapshot
+from back.routers.menu import get_menu_read_session_runner
+from back.services.menu import MenuService
+from back.services.menu_cache import menu_cache
+from main import app
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+def test_instrumented_pool_reports_checkouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=2,
+        max_overflow=0,
+    )
+
+    warm_up_pool(engine, 2)
+    stats = pool_stats(engine.pool)
+
+    assert stats["checked_in"] == 2
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 2
+    assert stats["waiting"] == 0
+
+    with engine.connect():
+        assert pool_stats(engine.pool)["checked_out"] == 1
+
+    assert pool_stats(engine.pool)["waits"] == 0
+    engine.dispose()
+
+def test_instrumented_pool_counts_only_blocked_checkouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+
+    with engine.connect():
+        waiter = threading.Thread(target=lambda: engine.connect().close())
+        waiter.start()
+        deadline = time.monotonic() + 5
+        while pool_stats(engine.pool)["waiting"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert pool_stats(engine.pool)["waiting"] == 1
+
+    waiter.join()
+    stats = pool_stats(engine.pool)
+    assert stats["waiting"] == 0
+    assert stats["waits"] == 1
+    assert stats["checkouts"] == 2
+    engine.dispose()
+
+def test_unsupported_dialect_is_refused_at_engine_creation():
+    check_dialect(create_engine("sqlite://"))
+
+    with pytest.raises(UnsupportedDatabaseError):
+        check_dialect(SimpleNamespace(dialect=SimpleNamespace(name="mysql")))
+
+def test_metrics_include_db_pool(client, admin_token_header):
+    response = client.get("/metrics", headers=admin_token_header)
+
+    assert response.status_code == 200
+    assert "db_pool" in response.json()
+
+def test_metrics_require_admin(client, user_token_header):
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers=user_token_header).status_code == 403
+
+IMPORT_TIME_BUDGET_SECONDS = 3.0
+
+def test_app_import_is_fast_and_does_not_touch_database():
+    script = (
+        "import time\n"
+        "started = time.perf_counter()\n"
+        "import main\n"
+        "elapsed = time.perf_counter() - started\n"
+        "from back.db import session\n"
+        "assert session._engine is None, 'engine created at import time'\n"
+        "print(elapsed)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert float(result.stdout.strip().splitlines()[-1]) < IMPORT_TIME_BUDGET_SECONDS
+
+def test_async_database_url_uses_async_drivers():
+    assert async_database_url("postgresql://u:p@localhost/db") == "postgresql+asyncpg://u:p@localhost/db"
+    assert async_database_url("sqlite:///./main.db") == "sqlite+aiosqlite:///./main.db"
+
+def test_async_session_runner_runs_sync_services(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    with Session(sync_engine) as session:
+        session.add(Category(name="Pizza"))
+        session.commit()
+    sync_engine.dispose()
+
+    async def scenario():
+        engine = create_async_engine(async_database_url(url), **async_engine_options(url))
+        async with AsyncSession(engine) as session:
+            categories = await AsyncSessionRunner(session).run(lambda db: MenuService(db).get_all_categories())
+        await engine.dispose()
+        return categories
+
+    categories = asyncio.run(scenario())
+
+    assert [category.name for category in categories] == ["Pizza"]
+
+def test_async_runner_serves_authenticated_requests_end_to_end(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async_app.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    with Session(sync_engine) as session:
+        user = User(username="asyncuser", email="async@example.com", hashed_password="unused")
+        category = Category(name="Pizza")
+        session.add_all([user, category])
+        session.flush()
+        item = MenuItem(name="Pepperoni", price_cents=1500, stock=10, category_id=category.id)
+        session.add(item)
+        session.commit()
+        user_id, item_id = user.id, item.id
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(async_database_url(url), poolclass=NullPool)
+
+    async def async_runner():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield AsyncSessionRunner(session)
+
+    def no_sync_session():
+        raise AssertionError("a sync session was opened")
+
+    app.dependency_overrides.update({
+        get_session_runner: async_runner,
+        get_user_read_session_runner: async_runner,
+        get_db: no_sync_session,
+    })
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': str(user_id), 'role': 'user'})}"}
+
+    try:
+        with TestClient(app) as client:
+            added = client.post("/cart/add-item", headers=headers, json={"menu_item_id": item_id, "quantity": 2})
+            cart = client.get("/cart/cart-items", headers=headers)
+            history = client.get("/cart/orders", headers=headers)
+    finally:
+        app.dependency_overrides.clear()
+        asyncio.run(async_engine.dispose())
+
+    assert added.status_code == 200
+    assert cart.json()["total_price_cents"] == 3000
+    assert history.json() == {"orders": [], "next_cursor": None}
+    assert principal_cache.get(str(user_id)).id == user_id
+
+@pytest.fixture
+def sqlite_replica(tmp_path, monkeypatch):
+    monkeypatch.setattr(read_routing, "REPLICA_URL", f"sqlite:///{tmp_path / 'replica.db'}")
+    replica.reset()
+    yield
+    replica.reset()
+
+def test_reads_use_replica_when_configured(sqlite_replica):
+    assert read_routing.use_replica()
+
+def test_reads_stick_to_primary_within_the_client_window(sqlite_replica):
+    assert read_routing.primary_pinned(str(read_routing.read_your_writes_until()))
+    assert not read_routing.use_replica(pinned=True)
+
+    assert not read_routing.primary_pinned(None)
+    assert not read_routing.primary_pinned("not-a-number")
+    assert not read_routing.primary_pinned(str(time.time() - 1))
+    # A forged far-future deadline would pin the client to the primary forever.
+    assert not read_routing.primary_pinned(str(time.time() + 3600))
+
+def test_writes_hand_the_client_a_read_your_writes_deadline(client, sqlite_replica, user_token_header, menu_item):
+    read = client.get("/cart/orders", headers=user_token_header)
+    assert replica.READ_YOUR_WRITES_HEADER not in read.headers
+
+    written = client.post("/cart/add-item", headers=user_token_header,
+                          json={"menu_item_id": menu_item.id, "quantity": 1})
+    until = written.headers[replica.READ_YOUR_WRITES_HEADER]
+
+    assert read_routing.primary_pinned(until)
+    assert written.cookies[replica.READ_YOUR_WRITES_COOKIE] == until
+
+def test_read_session_honours_the_client_deadline(sqlite_replica):
+    def request(headers):
+        return Request({"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]})
+
+    pinned = request({replica.READ_YOUR_WRITES_HEADER: str(read_routing.read_your_writes_until())})
+    routed = read_routing._routing["primary"]
+
+    for db in replica.get_read_db(pinned):
+        assert db.get_bind() is not read_routing.get_replica_engine()
+    assert read_routing._routing["primary"] == routed + 1
+
+    for db in replica.get_read_db(request({})):
+        assert db.get_bind() is read_routing.get_replica_engine()
+
+def test_first_menu_rebuild_after_a_write_reads_the_primary(sqlite_replica):
+    def read_session():
+        runners = get_menu_read_session_runner(Request({"type": "http", "headers": []}))
+        db = next(runners).db
+        runners.close()
+        return db
+
+    assert read_routing.is_replica_session(read_session())
+
+    menu_cache.bump()
+    assert not read_routing.is_replica_session(read_session())
+
+    # A replica read that raced the write is served but not cached under the new version.
+    menu_cache.get_with_etag(lambda: MenuSnapshot(categories=[]), from_replica=True)
+    assert menu_cache.current_etag() is None
+
+    menu_cache.get_with_etag(lambda: MenuSnapshot(categories=[]))
+    assert menu_cache.current_etag() is not None
+    assert read_routing.is_replica_session(read_session())
+
+def test_reads_fall_back_to_primary_when_replica_lags(sqlite_replica, monkeypatch):
+    monkeypatch.setattr(read_routing, "_measure_lag", lambda engine: read_routing.REPLICA_MAX_LAG_SECONDS + 1)
+
+    assert not read_routing.use_replica()
+
+def test_reads_fall_back_to_primary_when_replica_unavailable(tmp_path, monkeypatch):
+    monkeypatch.setattr(read_routing, "REPLICA_URL", f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    replica.reset()
+
+    assert not read_routing.use_replica()
+    replica.reset()
+
+def test_init_db_closes_duplicate_carts_before_unique_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_orders_user_id_cart"))
+        conn.execute(insert(User).values(id=1, username="u", email="u@example.com", hashed_password="x", phone_number="1"))
+        conn.execute(insert(Order), [{"user_id": 1, "status": "cart", "total_price_cents": 0}] * 2)
+
+    init_db(engine)
+
+    with engine.connect() as conn:
+        statuses = conn.execute(text("SELECT id, status FROM orders ORDER BY id")).all()
+        assert statuses == [(1, "abandoned"), (2, "cart")]
+        with pytest.raises(IntegrityError):
+            conn.execute(insert(Order).values(user_id=1, status="cart", total_price_cents=0))
+    engine.dispose()
+
+
+def test_init_db_merges_duplicate_order_lines_before_unique_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX uq_order_items_order_id_menu_item_id"))
+        conn.execute(insert(User).values(id=1, username="u", email="u@example.com", hashed_password="x", phone_number="1"))
+        conn.execute(insert(Category).values(id=1, name="Pizza"))
+        conn.execute(insert(MenuItem), [
+            {"id": item_id, "name": f"Item {item_id}", "price_cents": 1000, "stock": 10, "category_id": 1}
+            for item_id in (1, 2)
+        ])
+        conn.execute(insert(Order).values(id=1, user_id=1, status="placed", total_price_cents=6000))
+        conn.execute(insert(OrderItem), [
+            {"order_id": 1, "menu_item_id": menu_item_id, "quantity": quantity, "price_cents_snapshot": 1000}
+            for menu_item_id, quantity in ((1, 2), (2, 1), (1, 3))
+        ])
+
+    init_db(engine)
+
+    with engine.connect() as conn:
+        lines = conn.execute(text("SELECT menu_item_id, quantity FROM order_items ORDER BY menu_item_id")).all()
+        assert lines == [(1, 5), (2, 1)]
+        with pytest.raises(IntegrityError):
+            conn.execute(insert(OrderItem).values(order_id=1, menu_item_id=2, quantity=1, price_cents_snapshot=1000))
+    engine.dispose()
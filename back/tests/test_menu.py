@@ -1,5 +1,24 @@
+import threading
+import time
 import pytest
 from io import BytesIO
+from back.models.menu import CategoryOut, MenuItemOut, MenuSnapshot
+from back.services.menu_cache import MenuCache, menu_cache
+from back.services.menu_search import MenuSearchIndex, MenuSearchIndexCache, menu_search_index
+from back.db.menu import Category, MenuItem
+
+@pytest.fixture
+def full_menu(db):
+    categories = [Category(name=name) for name in ("Pizza", "Drinks", "Desserts")]
+    db.add_all(categories)
+    db.flush()
+    db.add_all([
+        MenuItem(name=f"{category.name} {n}", price_cents=500 + n, stock=5, is_available=n % 2 == 0,
+                 category_id=category.id, image_url=f"/static/{category.name}-{n}.jpg")
+        for category in categories[:2] for n in range(3)
+    ])
+    db.commit()
+    return categories
 
 def test_create_category(client, admin_token_header):
     response = client.post(
@@ -116,6 +135,277 @@ def test_get_items_by_category(client, admin_token_header, category):
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
+@pytest.mark.usefixtures("no_lazy_loads")
+def test_menu_snapshot_is_one_query(client, db, full_menu, select_queries):
+    db.expire_all()
+    select_queries.clear()
+
+    response = client.get("/menu/snapshot")
+
+    assert response.status_code == 200
+    assert len(select_queries) == 1
+    categories = response.json()["categories"]
+    assert [category["name"] for category in categories] == ["Pizza", "Drinks", "Desserts"]
+    assert [len(category["items"]) for category in categories] == [3, 3, 0]
+    assert categories[0]["items"][1] == {
+        "id": categories[0]["items"][1]["id"], "name": "Pizza 1", "description": None, "price_cents": 501,
+        "stock": 5, "is_available": False, "category_id": full_menu[0].id, "image_url": "/static/Pizza-1.jpg",
+    }
+
+
+@pytest.mark.usefixtures("no_lazy_loads")
+@pytest.mark.parametrize("path", ["/menu/get_all_categories", "/menu/get_items_by_category/{id}"])
+def test_category_listings_use_the_snapshot_query(client, db, full_menu, select_queries, path):
+    path = path.format(id=full_menu[1].id)
+    db.expire_all()
+    select_queries.clear()
+
+    response = client.get(path)
+
+    assert response.status_code == 200
+    assert len(select_queries) == 1
+
+
+def test_menu_cache_serves_repeat_reads_until_a_write(client, db, admin_token_header, full_menu, select_queries):
+    menu_item = db.query(MenuItem).filter(MenuItem.name == "Pizza 0").one()
+    client.get("/menu/snapshot")
+    select_queries.clear()
+
+    cached = client.get("/menu/snapshot")
+
+    assert select_queries == []
+    assert menu_cache.stats()["hits"] == 1
+
+    version = menu_cache.version
+    client.patch(f"/menu/update_item/{menu_item.id}", headers=admin_token_header, json={"name": "Renamed"})
+    refreshed = client.get("/menu/snapshot")
+
+    assert menu_cache.version == version + 1
+    assert "Renamed" not in cached.text
+    assert "Renamed" in refreshed.text
+    assert client.get("/metrics", headers=admin_token_header).json()["menu_cache"]["rebuilds"] == 2
+
+
+def test_menu_cache_single_flight_on_concurrent_misses():
+    cache = MenuCache(max_age=60)
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.05)
+        return MenuSnapshot(categories=[])
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_build(build))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert len(results) == 8
+    assert cache.stats()["misses"] == 1
+
+
+def test_menu_cache_indexes_categories_once_per_snapshot():
+    cache = MenuCache(max_age=60)
+    snapshot, etag = cache.get_with_etag(lambda: MenuSnapshot(categories=[
+        CategoryOut(id=1, name="Pizza", items=[]), CategoryOut(id=2, name="Drinks", items=[]),
+    ]))
+
+    by_id, by_name = cache.categories(snapshot, etag)
+
+    assert by_id[2] is by_name["Drinks"] is snapshot.categories[1]
+    assert cache.categories(snapshot, etag)[0] is by_id
+
+    cache.bump()
+    snapshot, etag = cache.get_with_etag(lambda: MenuSnapshot(categories=[CategoryOut(id=3, name="Desserts", items=[])]))
+
+    assert list(cache.categories(snapshot, etag)[0]) == [3]
+
+
+def test_category_point_lookups_reuse_the_cached_snapshot(client, admin_token_header, full_menu, select_queries):
+    pizza_id, drinks_id = full_menu[0].id, full_menu[1].id
+    client.get("/menu/get_category_by_name/Pizza", headers=admin_token_header)
+    select_queries.clear()
+
+    by_name = client.get("/menu/get_category_by_name/Drinks", headers=admin_token_header)
+    by_category = client.get(f"/menu/get_items_by_category/{pizza_id}")
+
+    assert by_name.json()["id"] == drinks_id
+    assert [item["name"] for item in by_category.json()] == ["Pizza 0", "Pizza 1", "Pizza 2"]
+    assert select_queries == []
+
+
+def test_menu_conditional_get_returns_304_without_queries(client, db, admin_token_header, full_menu, select_queries):
+    first = client.get("/menu/snapshot")
+    etag = first.headers["ETag"]
+
+    assert "stale-while-revalidate=" in first.headers["Cache-Control"]
+
+    select_queries.clear()
+    cached = client.get("/menu/snapshot", headers={"If-None-Match": etag})
+
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert select_queries == []
+
+    menu_item = db.query(MenuItem).filter(MenuItem.name == "Drinks 2").one()
+    client.patch(f"/menu/update_item/{menu_item.id}", headers=admin_token_header, json={"price_cents": 999})
+    changed = client.get("/menu/snapshot", headers={"If-None-Match": etag})
+
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_menu_etags_differ_per_representation(client, full_menu):
+    etags = {
+        client.get(path).headers["ETag"]
+        for path in ("/menu/snapshot", "/menu/get_all_categories",
+                     f"/menu/get_items_by_category/{full_menu[0].id}", f"/menu/get_items_by_category/{full_menu[1].id}")
+    }
+
+    assert len(etags) == 4
+    response = client.get(f"/menu/get_items_by_category/{full_menu[0].id}", headers={"If-None-Match": "*"})
+    assert response.status_code == 304
+
+    response = client.get("/menu/get_items_by_category/999999", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def searchable_menu(db, category):
+    items = [
+        MenuItem(name="Pepperoni", description="Spicy salami and mozzarella", price_cents=1500, stock=5,
+                 category_id=category.id),
+        MenuItem(name="Margherita", description="Tomato, basil and mozzarella", price_cents=1200, stock=5,
+                 category_id=category.id),
+        MenuItem(name="Bianca", description="Like a margherita without the tomato", price_cents=1300, stock=5,
+                 category_id=category.id),
+    ]
+    db.add_all(items)
+    db.commit()
+    return items
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("pep", ["Pepperoni"]),
+    ("peperoni", ["Pepperoni"]),
+    ("MOZZ", ["Margherita", "Pepperoni"]),
+    ("tomato basil", ["Margherita"]),
+])
+def test_menu_search_matches_prefixes_and_typos(client, searchable_menu, query, expected):
+    response = client.get("/menu/search", params={"q": query})
+
+    assert response.status_code == 200
+    assert sorted(item["name"] for item in response.json()["items"]) == expected
+
+
+def test_menu_search_ranks_name_matches_first(client, searchable_menu):
+    response = client.get("/menu/search", params={"q": "margherita"})
+
+    assert [item["name"] for item in response.json()["items"]] == ["Margherita", "Bianca"]
+
+
+def test_menu_search_paginates(client, full_menu):
+    first = client.get("/menu/search", params={"q": "pizza", "limit": 2}).json()
+    second = client.get("/menu/search", params={"q": "pizza", "limit": 2, "offset": first["next_offset"]}).json()
+
+    assert [item["name"] for item in first["items"]] == ["Pizza 0", "Pizza 1"]
+    assert first["next_offset"] == 2
+    assert [item["name"] for item in second["items"]] == ["Pizza 2"]
+    assert second["next_offset"] is None
+
+
+def test_menu_search_sees_menu_writes(client, admin_token_header, searchable_menu):
+    assert client.get("/menu/search", params={"q": "quattro"}).json()["items"] == []
+
+    client.post(
+        "/menu/create_item",
+        headers=admin_token_header,
+        files={"image": ("test.jpg", BytesIO(b"fake image data"), "image/jpeg")},
+        data={"name": "Quattro Formaggi", "description": "Four cheeses", "price_cents": 1400,
+              "category_id": searchable_menu[0].category_id},
+    )
+    # Without Postgres the first search after a write starts an index rebuild in the background.
+    client.get("/menu/search", params={"q": "quattro"})
+    menu_search_index.wait()
+    response = client.get("/menu/search", params={"q": "quattro"})
+
+    assert [item["name"] for item in response.json()["items"]] == ["Quattro Formaggi"]
+
+
+def _index_item(item_id, name, description=None):
+    return MenuItemOut(id=item_id, name=name, description=description, price_cents=1000, stock=1,
+                       is_available=True, category_id=1, image_url=None)
+
+
+@pytest.fixture
+def search_index():
+    return MenuSearchIndex([
+        _index_item(1, "Pepperoni", "Spicy salami and mozzarella"),
+        _index_item(2, "Margherita", "Tomato, basil and mozzarella"),
+        _index_item(3, "Bianca", "Like a margherita without the tomato"),
+        _index_item(4, "Pepper Steak"),
+        _index_item(5, "Mozzarella Sticks", "Fried"),
+    ])
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("margherita", ["Margherita", "Bianca"]),
+    ("pep", ["Pepper Steak", "Pepperoni"]),
+    ("peperoni", ["Pepperoni", "Pepper Steak"]),
+    ("mozzarella tomato", ["Margherita"]),
+    ("mozzarella", ["Mozzarella Sticks", "Margherita", "Pepperoni"]),
+    ("mozzarella nothing", []),
+    ("", []),
+    ("!!", []),
+])
+def test_search_index_ranks_without_a_database(search_index, query, expected):
+    assert [item.name for item in search_index.search(query, 10)] == expected
+
+
+def test_search_index_respects_the_limit(search_index):
+    assert [item.name for item in search_index.search("mozzarella", 2)] == ["Mozzarella Sticks", "Margherita"]
+    assert search_index.search("mozzarella", 0) == []
+
+
+def test_search_index_cache_rebuilds_in_the_background():
+    cache = MenuSearchIndexCache()
+    first = MenuSearchIndex([_index_item(1, "Pepperoni")])
+    second = MenuSearchIndex([_index_item(1, "Pepperoni"), _index_item(2, "Quattro Formaggi")])
+    release = threading.Event()
+    builders = []
+
+    def build_second():
+        builders.append(threading.current_thread().name)
+        release.wait()
+        return second
+
+    assert cache.get("v1", lambda: first) is first
+    # The new version builds on another thread while searches keep the old index.
+    assert cache.get("v2", build_second) is first
+    assert cache.get("v2", build_second) is first
+    release.set()
+    cache.wait()
+
+    assert cache.get("v2", build_second) is second
+    assert builders == ["menu-search-index"]
+    assert cache.stats()["builds"] == 2
+    assert cache.stats()["stale_reads"] == 2
+
+
+def test_menu_search_rejects_empty_query(client):
+    assert client.get("/menu/search", params={"q": ""}).status_code == 422
+
+
+def test_get_items_by_unknown_category(client):
+    response = client.get("/menu/get_items_by_category/999999")
+
+    assert response.status_code == 404
+
+
 def test_update_menu_item(client, admin_token_header, menu_item):
     response = client.patch(
         f"/menu/update_item/{menu_item.id}",
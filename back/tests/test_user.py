@@ -1,6 +1,9 @@
 import pytest
 from back.db.user import User as UserModel
 from back.core.security import create_access_token, hash_password
+import back.core.dependencies as dependencies
+from back.core.principal_cache import invalidate_principal, principal_cache
+from back.crud.user import set_admin_role
 
 def test_get_me(client, user_token_header):
     response = client.get("/users/me", headers=user_token_header)
@@ -101,4 +104,37 @@ def test_login_with_old_password_after_change(client, user_token_header, user):
         },
     )
 
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+def test_current_user_is_cached(client, user_token_header, admin_token_header):
+    client.get("/cart/cart-items", headers=user_token_header)
+    client.get("/cart/cart-items", headers=user_token_header)
+
+    assert principal_cache.stats()["hits"] >= 1
+
+    response = client.get("/metrics", headers=admin_token_header)
+
+    assert response.status_code == 200
+    assert response.json()["principal_cache"]["hits"] >= 1
+
+def test_principal_loaded_across_an_invalidation_is_not_cached(client, user, user_token_header, monkeypatch):
+    load_principal = dependencies._load_principal
+
+    def load_then_invalidate(db, user_id):
+        principal = load_principal(db, user_id)
+        invalidate_principal(user.id)
+        return principal
+
+    monkeypatch.setattr(dependencies, "_load_principal", load_then_invalidate)
+    response = client.get("/cart/cart-items", headers=user_token_header)
+
+    assert response.status_code == 200
+    assert principal_cache.get(str(user.id)) is None
+
+def test_set_admin_role_invalidates_cached_user(client, db, user, user_token_header):
+    response = client.post("/menu/create_category", headers=user_token_header, json={"name": "Pizza"})
+    assert response.status_code == 403
+
+    set_admin_role(db, user.id)
+
+    response = client.post("/menu/create_category", headers=user_token_header, json={"name": "Pizza"})
+    assert response.status_code == 200
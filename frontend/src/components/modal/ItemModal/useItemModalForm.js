@@ -1,5 +1,6 @@
 import { useState, useEffect } from 'react';
 import { toast } from 'react-toastify';
+import { rememberWrite } from '../../../utils/readYourWrites';
 
 export default function useItemModalForm({ mode = 'create', item, categoryID, isModalOpen, onSubmit, onClose }) {
     const [formData, setFormData] = useState({
@@ -95,6 +96,7 @@ export default function useItemModalForm({ mode = 'create', item, categoryID, is
                         is_available: formData.is_available,
                     }),
                 });
+                rememberWrite(response);
                 result = await response.json();
                 if (!response.ok) {
                     toast.error(result.message || 'Failed to update item.');
@@ -111,6 +113,7 @@ export default function useItemModalForm({ mode = 'create', item, categoryID, is
                         },
                         body: imgData,
                     });
+                    rememberWrite(imgRes);
                     const imgResult = await imgRes.json();
                     if (!imgRes.ok) {
                         toast.error(imgResult.message || 'Image upload failed.');
@@ -135,6 +138,7 @@ export default function useItemModalForm({ mode = 'create', item, categoryID, is
                     },
                     body: data,
                 });
+                rememberWrite(response);
                 result = await response.json();
                 if (!response.ok) {
                     toast.error(result.message || 'Failed to create item.');
@@ -1,7 +1,7 @@
 import React from 'react';
 import './OrdersHistory.css';
 
-const OrdersHistory = ({ orders, loading, error }) => {
+const OrdersHistory = ({ orders, loading, error, hasMore, loadingMore, onLoadMore }) => {
     if (loading) return <p className="orders-empty">Loading...</p>;
     if (error) return <p className="orders-empty">Error: {error}</p>;
     if (!orders || orders.length === 0) return <p className="orders-empty">No orders yet</p>;
@@ -28,6 +28,11 @@ const OrdersHistory = ({ orders, loading, error }) => {
                     </div>
                 </div>
             ))}
+            {hasMore && (
+                <button className="orders-load-more" onClick={onLoadMore} disabled={loadingMore}>
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+            )}
         </div>
     );
 };
@@ -8,7 +8,7 @@ import OrdersHistory from './OrdersHistory';
 
 import './UserCard.css';
 
-const UserCard = ({ userInfo, refetch, onLogout, orders, ordersLoading, ordersError }) => {
+const UserCard = ({ userInfo, refetch, onLogout, orders, ordersLoading, ordersError, hasMoreOrders, loadingMoreOrders, onLoadMoreOrders }) => {
   const [isEditOpen, setIsEditOpen] = useState(false);
 
   return (
@@ -29,7 +29,14 @@ const UserCard = ({ userInfo, refetch, onLogout, orders, ordersLoading, ordersEr
       </div>
 
       <div className='orders-card'>
-        <OrdersHistory orders={orders} loading={ordersLoading} error={ordersError} />
+        <OrdersHistory
+          orders={orders}
+          loading={ordersLoading}
+          error={ordersError}
+          hasMore={hasMoreOrders}
+          loadingMore={loadingMoreOrders}
+          onLoadMore={onLoadMoreOrders}
+        />
       </div>
     </>
   );
@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react';
 import useItems from './useItems';
 import { toast } from 'react-toastify';
+import { readYourWritesHeaders, rememberWrite } from '../../utils/readYourWrites';
 
 const useCategories = () => {
     const [categories, setCategories] = useState([]);
@@ -19,6 +20,7 @@ const useCategories = () => {
                 method: 'GET',
                 headers: {
                 Authorization: `Bearer ${token}`,
+                ...readYourWritesHeaders(),
                 },
             });
 
@@ -51,6 +53,7 @@ const useCategories = () => {
                 body: JSON.stringify({name}),
             });
 
+            rememberWrite(response);
             const data = await response.json();
 
             if (!response.ok) {
@@ -85,6 +88,7 @@ const useCategories = () => {
                     },                
                 });
     
+                rememberWrite(response);
                 const data = await response.json();
     
                 if (!response.ok) {
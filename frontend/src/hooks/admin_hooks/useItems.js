@@ -1,5 +1,6 @@
 import { useState } from 'react';
 import { toast } from 'react-toastify';
+import { readYourWritesHeaders, rememberWrite } from '../../utils/readYourWrites';
 
 const useItems = () => {
     const [itemsByCategory, setItemsByCategory] = useState({});
@@ -11,6 +12,7 @@ const useItems = () => {
             const response = await fetch(`${process.env.REACT_APP_API_URL}/menu/get_items_by_category/${categoryID}`, {
                 headers: {
                     Authorization: `Bearer ${token}`,
+                    ...readYourWritesHeaders(),
                 },
             });
             
@@ -42,6 +44,7 @@ const useItems = () => {
                     },
                 });
 
+                rememberWrite(response);
                 const data = await response.json();
 
                 if(!response.ok) {
@@ -2,6 +2,7 @@ import { useEffect, useMemo, useState } from 'react';
 import { updateCartItemQuantity, removeItemFromCart } from '../../utils/cart.js';
 import { toast } from 'react-toastify';
 import { getAuthToken, getUserIdFromToken } from '../../utils/auth.js';
+import { rememberWrite } from '../../utils/readYourWrites.js';
 
 const GUEST_CART_KEY = 'guest_cart';
 
@@ -126,6 +127,7 @@ const useCart = ({ onAddedToCart, onOrderPlaced} = {}) => {
         }),
       });
 
+      rememberWrite(response);
       const data = await response.json();
       if (!response.ok) {
         toast.error(data.detail || 'Failed to add item to cart');
@@ -165,6 +167,7 @@ const useCart = ({ onAddedToCart, onOrderPlaced} = {}) => {
         }),
       });
 
+      rememberWrite(response);
       const data = await response.json();
       if (!response.ok) throw new Error(data.detail || 'Failed to update quantity');
       
@@ -194,6 +197,7 @@ const useCart = ({ onAddedToCart, onOrderPlaced} = {}) => {
         }
       );
 
+      rememberWrite(response);
       const data = await response.json();
       if (!response.ok) throw new Error(data.detail || 'Failed to remove item');
 
@@ -219,6 +223,7 @@ const useCart = ({ onAddedToCart, onOrderPlaced} = {}) => {
         headers: { Authorization: `Bearer ${token}` },
       });
 
+      rememberWrite(response);
       const data = await response.json();
       if (!response.ok) {
         toast.error(data.detail || 'Failed to clear cart');
@@ -246,6 +251,7 @@ const useCart = ({ onAddedToCart, onOrderPlaced} = {}) => {
         headers: { Authorization: `Bearer ${token}` },
       });
 
+      rememberWrite(response);
       const data = await response.json();
       if (!response.ok) {
         toast.error(data.detail || 'Failed to place order');
@@ -286,6 +292,7 @@ const useCart = ({ onAddedToCart, onOrderPlaced} = {}) => {
         }),
       });
 
+      rememberWrite(response);
       if (!response.ok) {
         const data = await response.json();
         throw new Error(data.detail || 'Failed to migrate cart');
@@ -1,47 +1,22 @@
 import { useEffect, useState } from "react";
 import { getAuthToken } from "../../utils/auth";
+import { readYourWritesHeaders } from "../../utils/readYourWrites";
 import { toast } from 'react-toastify';
 
 const useCatalog =() => {
     const [categories, setCategories] = useState([]);
     const [itemsByCategory, setItemsByCategory] = useState({});
     
-    const fetchItemsByCategory = async (categoryID) => {
+    const fetchCategories = async () => {
             try {
                 const token = getAuthToken();
     
-                const response = await fetch(`${process.env.REACT_APP_API_URL}/menu/get_items_by_category/${categoryID}`, {
-                    headers: {
-                        Authorization: `Bearer ${token}`,
-                    },
-                });
-    
-                const data = await response.json();
-    
-                if (!response.ok) {
-                    console.log(data);
-                    toast.error(data.detail || "Could not fetch items");
-                    return;
-                }
-    
-                setItemsByCategory((prevItems) => ({
-                    ...prevItems,
-                    [categoryID]: data,
-                }));
-            } catch (error) {
-                console.error('Error fetching items by category:', error);
-                toast.error("Network error");
-            }
-        };
-    
-        const fetchCategories = async () => {
-            try {
-                const token = getAuthToken();
-    
-                const response = await fetch(`${process.env.REACT_APP_API_URL}/menu/get_all_categories`, {
+                // One request returns every category together with its items.
+                const response = await fetch(`${process.env.REACT_APP_API_URL}/menu/snapshot`, {
                     method: 'GET',
                     headers: {
                     Authorization: `Bearer ${token}`,
+                    ...readYourWritesHeaders(),
                     },
                 });
     
@@ -53,8 +28,10 @@ const useCatalog =() => {
                     return;
                 }
     
-                setCategories(data);
-                data.forEach(category => fetchItemsByCategory(category.id));
+                setCategories(data.categories);
+                setItemsByCategory(Object.fromEntries(
+                    data.categories.map(category => [category.id, category.items])
+                ));
                 
             } catch (error) {
                 console.error('Error fetching categories:', error);
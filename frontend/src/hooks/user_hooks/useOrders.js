@@ -1,46 +1,69 @@
 import { getAuthToken } from '../../utils/auth';
+import { readYourWritesHeaders } from '../../utils/readYourWrites';
 import { useState } from 'react';
 
 const useOrders =() => {
     const [orders, setOrders] = useState([]);
+    const [nextCursor, setNextCursor] = useState(null);
     const [loading, setLoading] = useState(false);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [error, setError] = useState(null);
-    
-    const fetchOrders = async () => {
-        setLoading(true);
-        setError(null);
 
+    // /cart/orders returns one page ({orders, next_cursor}); a cursor fetches the page after it.
+    const requestOrders = async (cursor) => {
         const token = getAuthToken();
 
         if (!token ) {
             setError('User not authenticated');
-            setLoading(false);
-            return;
+            return null;
         }
 
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
         try {
-            const response = await fetch(`${process.env.REACT_APP_API_URL}/cart/orders`, {
+            const response = await fetch(`${process.env.REACT_APP_API_URL}/cart/orders${query}`, {
                 headers: {
                     Authorization: `Bearer ${token}`,
+                    ...readYourWritesHeaders(),
                 },
             });
 
             const data = await response.json();
             if (!response.ok) {
                 setError(data.detail || 'Failed to fetch orders');
-                setOrders([]);
-                return;
+                return null;
             }
-            setOrders(data);
+            return data;
         } catch (err) {
             setError('Network error');
-            setOrders([]);
-        } finally {
-            setLoading(false);
+            return null;
         }
-    }
-    return { orders, loading, error, fetchOrders };
+    };
+
+    const fetchOrders = async () => {
+        setLoading(true);
+        setError(null);
+
+        const page = await requestOrders(null);
+        setOrders(page ? page.orders : []);
+        setNextCursor(page ? page.next_cursor : null);
+        setLoading(false);
+    };
+
+    const loadMoreOrders = async () => {
+        if (!nextCursor || loadingMore) return;
+
+        setLoadingMore(true);
+        setError(null);
+
+        const page = await requestOrders(nextCursor);
+        if (page) {
+            setOrders(prev => [...prev, ...page.orders]);
+            setNextCursor(page.next_cursor);
+        }
+        setLoadingMore(false);
+    };
+
+    return { orders, loading, error, fetchOrders, hasMoreOrders: Boolean(nextCursor), loadingMore, loadMoreOrders };
 };
 
 export default useOrders;
-
@@ -29,7 +29,7 @@ const UserDashboard = ({ onLogout, onLoginSuccess, isLoggedIn }) => {
         setIsItemModalOpen(true);
     };
 
-    const { orders, loading, error: ordersError, fetchOrders } = useOrders();
+    const { orders, loading, error: ordersError, fetchOrders, hasMoreOrders, loadingMore, loadMoreOrders } = useOrders();
     const { categories, itemsByCategory } = useCatalog();
     const {
         isCartOpen,
@@ -92,6 +92,9 @@ const UserDashboard = ({ onLogout, onLoginSuccess, isLoggedIn }) => {
                         orders={orders}
                         ordersLoading={loading}
                         ordersError={ordersError}
+                        hasMoreOrders={hasMoreOrders}
+                        loadingMoreOrders={loadingMore}
+                        onLoadMoreOrders={loadMoreOrders}
                     />
                 ) : (
                     <AuthSidebar
@@ -0,0 +1,16 @@
+// The API answers writes with a short deadline; sending it back keeps our next reads on
+// the primary database, whichever server handles them, so we never read our own
+// writes stale from a replica.
+const HEADER = 'X-Read-Your-Writes-Until';
+const STORAGE_KEY = 'read_your_writes_until';
+
+export const rememberWrite = (response) => {
+    const until = response.headers.get(HEADER);
+    if (until) sessionStorage.setItem(STORAGE_KEY, until);
+};
+
+export const readYourWritesHeaders = () => {
+    const until = sessionStorage.getItem(STORAGE_KEY);
+    if (!until || Number(until) * 1000 <= Date.now()) return {};
+    return { [HEADER]: until };
+};
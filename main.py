@@ -1,28 +1,54 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from back.routers.auth import router as auth_router
 from back.routers.users import router as users_router
 from back.routers.menu import router as menu_router
 from back.routers.cart import router as cart_router
+from back.routers.metrics import router as metrics_router
 from back.core.logs import setup_logging
+from back.core.security import shutdown_hash_executor
+from back.db.session import warm_up as warm_up_db_pool
+from back.db.async_session import dispose_async_engine
+from back.db.replica import READ_YOUR_WRITES_HEADER, dispose_replica_engines, read_your_writes_middleware
+from back.services.cart_store import cart_store
+from back.services.menu import warm_up_search_index
+from back.jobs.abandoned_carts import start_cart_sweeper
 
 setup_logging()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up_db_pool()
+    await run_in_threadpool(warm_up_search_index)
+    cart_sweeper = start_cart_sweeper()
+    yield
+    if cart_sweeper:
+        cart_sweeper.cancel()
+    shutdown_hash_executor()
+    cart_store.close()
+    await dispose_async_engine()
+    await dispose_replica_engines()
 
+app = FastAPI(lifespan=lifespan)
+
+app.middleware("http")(read_your_writes_middleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[READ_YOUR_WRITES_HEADER],
 )
 
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(menu_router)
 app.include_router(cart_router)
+app.include_router(metrics_router)
 
 app.mount("/static", StaticFiles(directory="back/static"), name="static")
 